@@ -5,7 +5,9 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.db.models import Count
 from django.contrib.admin import SimpleListFilter
-from .models import User, SellerProfile
+from .authentication import invalidate_user_snapshot
+from .models import User, SellerProfile, RevokedToken
+from .stats import reconcile_user_stats
 from apps.common.models import Address
 
 try:
@@ -143,21 +145,31 @@ class UserAdmin(BaseUserAdmin):
 
     def activate_users(self, request, queryset):
         """Activate selected users"""
+        user_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=True)
+        invalidate_user_snapshot(*user_ids)
+        # update() skips the signals that keep the dashboard counters
+        reconcile_user_stats()
         self.message_user(request, f'{updated} users activated successfully.')
 
     activate_users.short_description = _('Activate selected users')
 
     def deactivate_users(self, request, queryset):
         """Deactivate selected users"""
+        user_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=False)
+        invalidate_user_snapshot(*user_ids)
+        # update() skips the signals that keep the dashboard counters
+        reconcile_user_stats()
         self.message_user(request, f'{updated} users deactivated successfully.')
 
     deactivate_users.short_description = _('Deactivate selected users')
 
     def verify_users(self, request, queryset):
         """Verify selected users"""
+        user_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_verified=True)
+        invalidate_user_snapshot(*user_ids)
         self.message_user(request, f'{updated} users verified successfully.')
 
     verify_users.short_description = _('Verify selected users')
@@ -222,10 +234,12 @@ class SellerProfileAdmin(admin.ModelAdmin):
 
     def approve_sellers(self, request, queryset):
         """Approve selected sellers"""
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_approved=True)
         # Also verify the users
-        user_ids = queryset.values_list('user_id', flat=True)
         User.objects.filter(id__in=user_ids).update(is_verified=True)
+        # update() skips the signals that keep the dashboard counters
+        reconcile_user_stats()
         self.message_user(request, f'{updated} sellers approved successfully.')
 
     approve_sellers.short_description = _('Approve selected sellers')
@@ -233,6 +247,15 @@ class SellerProfileAdmin(admin.ModelAdmin):
     def reject_sellers(self, request, queryset):
         """Reject selected sellers"""
         updated = queryset.update(is_approved=False)
+        # update() skips the signals that keep the dashboard counters
+        reconcile_user_stats()
         self.message_user(request, f'{updated} sellers rejected.')
 
     reject_sellers.short_description = _('Reject selected sellers')
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['jti', 'expires_at']
+    search_fields = ['jti']
+    readonly_fields = ['jti', 'expires_at']
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# The version only reaches the processes sharing the cache, so this bounds
+# how long other workers may serve a changed user's old snapshot
+SNAPSHOT_TIMEOUT = 5
+
+# Columns kept in a snapshot; every other User field is deferred
+SNAPSHOT_FIELDS = ('id', 'role', 'is_active', 'is_staff', 'is_superuser', 'address_id')
+
+# Per-process copies of recent snapshots, skips unpickling them on every request
+LOCAL_SIZE = 1024
+_local_snapshots = OrderedDict()
+_local_lock = threading.Lock()
+
+def version_key(user_id):
+    return f'accounts:user_version:{user_id}'
+
+def get_version(user_id):
+    version = cache.get(version_key(user_id))
+    if version is None:
+        # Started from the clock so an evicted version never comes back
+        cache.add(version_key(user_id), time.time_ns(), None)
+        version = cache.get(version_key(user_id))
+    return version
+
+def invalidate_user_snapshot(*user_ids):
+    """Drop cached snapshots of user_ids; call after any change to them"""
+    def bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(version_key(user_id))
+            except ValueError:
+                # No version yet, so no snapshot can hold one
+                pass
+
+    bump()
+    # Again once the change is visible, in case a request cached the old
+    # row under the new version meanwhile
+    transaction.on_commit(bump)
+
+def load_snapshot(user_id):
+    """
+    Compact dict of the user's auth columns, None if missing.
+
+    Cached under the user's version and again in process memory, so a warm
+    lookup is a single cache get. Saves in this process are seen at once,
+    saves elsewhere once SNAPSHOT_TIMEOUT has passed.
+    """
+    from .models import User
+
+    version = get_version(user_id)
+    local_key = (user_id, version)
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local_snapshots.get(local_key)
+        if entry is not None and entry[1] > now:
+            _local_snapshots.move_to_end(local_key)
+            return entry[0]
+
+    key = f'accounts:user_snapshot:{user_id}:{version}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = User.objects.filter(pk=user_id).values(*SNAPSHOT_FIELDS).first()
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+
+    with _local_lock:
+        _local_snapshots[local_key] = (snapshot, now + SNAPSHOT_TIMEOUT)
+        while len(_local_snapshots) > LOCAL_SIZE:
+            _local_snapshots.popitem(last=False)
+    return snapshot
+
+def build_user(snapshot):
+    """User instance from a snapshot; other fields load together on first access"""
+    from .models import User
+
+    # from_db expects values in field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in SNAPSHOT_FIELDS]
+    user = User.from_db(
+        router.db_for_read(User), names, [snapshot[name] for name in names]
+    )
+    return user
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving the user from a cached snapshot.
+
+    Authenticated requests that only check identity or role run no users
+    query.
+    """
+
+    def get_user(self, validated_token):
+        from .models import User
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        snapshot = load_snapshot(User._meta.pk.to_python(user_id))
+        if snapshot is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not snapshot['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return build_user(snapshot)
@@ -0,0 +1,19 @@
+from django.db.models import F
+from apps.common.exports import CHUNK_SIZE
+
+USER_EXPORT_COLUMNS = [
+    'id', 'phone_number', 'full_name', 'role', 'is_active', 'is_verified',
+    'created_at', 'address_name', 'seller_project_name', 'seller_category_id',
+    'seller_is_approved',
+]
+
+def iter_user_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Export rows for a User queryset with their seller profile, in id order"""
+    rows = queryset.order_by('id').values(
+        'id', 'phone_number', 'full_name', 'role', 'is_active', 'is_verified', 'created_at',
+        address_name=F('address__name'),
+        seller_project_name=F('seller_profile__project_name'),
+        seller_category_id=F('seller_profile__category_id'),
+        seller_is_approved=F('seller_profile__is_approved'),
+    )
+    return rows.iterator(chunk_size=chunk_size)
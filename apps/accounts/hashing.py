@@ -0,0 +1,71 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+class PasswordHashingBusy(APIException):
+    """Raised instead of queueing when the hashing pool is saturated"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many sign-in attempts in progress, try again shortly.')
+    default_code = 'password_hashing_busy'
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+class BoundedHashingPool:
+    """
+    Thread pool for password hashing with a hard cap on queued work.
+
+    At most max_workers hashes run at once and max_queue more may wait;
+    past that, submissions fail at once with PasswordHashingBusy, so a
+    login storm holds a bounded number of request workers and the rest
+    keep serving other requests. PBKDF2 releases the GIL, so the hashes
+    run in parallel.
+    """
+
+    def __init__(self, max_workers, max_queue, timeout):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hashing')
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PasswordHashingBusy()
+
+def get_pool():
+    """Pool for the current PASSWORD_HASHING_* settings, None when hashing runs inline"""
+    workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', min(os.cpu_count() or 1, 4))
+    if not workers:
+        return None
+    config = (
+        workers,
+        getattr(settings, 'PASSWORD_HASHING_QUEUE', workers * 4),
+        getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10),
+    )
+    if config not in _executors:
+        with _executors_lock:
+            if config not in _executors:
+                _executors[config] = BoundedHashingPool(*config)
+    return _executors[config]
+
+def run_hasher(func, *args):
+    """Run a hashing function on the bounded pool; must not touch the database"""
+    pool = get_pool()
+    if pool is None:
+        return func(*args)
+    return pool.run(func, *args)
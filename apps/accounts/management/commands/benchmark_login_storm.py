@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from apps.accounts.hashing import PasswordHashingBusy
+from apps.store.models import Ad
+from apps.store.serializers import project_ad_list, serialize_ad_rows
+
+class Command(BaseCommand):
+    help = 'Measure catalogue read latency during a login storm, with inline and pooled password hashing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Simulated request threads')
+        parser.add_argument('--pool-workers', type=int, default=2, help='PASSWORD_HASHING_WORKERS for the pooled run')
+        parser.add_argument('--pool-queue', type=int, default=2, help='PASSWORD_HASHING_QUEUE for the pooled run')
+        parser.add_argument('--reads', type=int, default=100, help='Catalogue reads issued')
+        parser.add_argument('--logins-per-read', type=int, default=2, help='Logins issued alongside each read')
+        parser.add_argument('--interval', type=float, default=10, help='Milliseconds between arrivals')
+
+    def handle(self, *args, **options):
+        runs = (
+            ('inline', {'PASSWORD_HASHING_WORKERS': 0}),
+            ('pooled', {
+                'PASSWORD_HASHING_WORKERS': options['pool_workers'],
+                'PASSWORD_HASHING_QUEUE': options['pool_queue'],
+            }),
+        )
+        for label, hashing in runs:
+            with override_settings(**hashing):
+                self.report(label, *self.storm(options))
+
+    def storm(self, options):
+        latencies, outcomes = [], []
+
+        def login(index):
+            try:
+                # Unknown users still pay for one hash, like a credential stuffing run
+                authenticate(username=f'+99800{index:07d}', password='benchmark-password')
+                outcomes.append('served')
+            except PasswordHashingBusy:
+                outcomes.append('rejected')
+
+        def read(submitted):
+            queryset = Ad.objects.filter(is_active=True).order_by('-published_at', '-id')
+            serialize_ad_rows(project_ad_list(queryset)[:20])
+            latencies.append(time.perf_counter() - submitted)
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as workers:
+            for step in range(options['reads']):
+                for offset in range(options['logins_per_read']):
+                    futures.append(workers.submit(login, step * options['logins_per_read'] + offset))
+                futures.append(workers.submit(read, time.perf_counter()))
+                time.sleep(options['interval'] / 1000)
+            wait(futures)
+        for future in futures:
+            future.result()
+        return sorted(latencies), outcomes
+
+    def report(self, label, latencies, outcomes):
+        def percentile(share):
+            return latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
+
+        self.stdout.write(
+            f'{label:<8} catalogue p50 {percentile(0.5):8.2f} ms  p99 {percentile(0.99):8.2f} ms  '
+            f'logins {outcomes.count("served")} served, {outcomes.count("rejected")} rejected'
+        )
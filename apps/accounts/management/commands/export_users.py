@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from apps.common.exports import CHUNK_SIZE, EXPORT_FORMATS, write_export
+from apps.accounts.exports import USER_EXPORT_COLUMNS, iter_user_rows
+from apps.accounts.filters import UserFilter
+from apps.accounts.models import User
+
+class Command(BaseCommand):
+    help = 'Stream users to a CSV or NDJSON file, filtered like the admin user list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='Output format')
+        parser.add_argument('--output', help='File to write; standard output when omitted')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per database round trip')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='UserFilter parameter, e.g. role=seller or is_active=true; repeatable'
+        )
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Expected NAME=VALUE, got {item!r}')
+            params.appendlist(name, value)
+
+        filterset = UserFilter(params, queryset=User.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        rows = iter_user_rows(filterset.qs, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                count = write_export(rows, USER_EXPORT_COLUMNS, options['format'], stream)
+            self.stderr.write(self.style.SUCCESS(f'Exported {count} users to {options["output"]}'))
+        else:
+            write_export(rows, USER_EXPORT_COLUMNS, options['format'], self.stdout)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.stats import reconcile_user_stats
+
+class Command(BaseCommand):
+    help = 'Recount the user statistics counters, correcting any drift'
+
+    def handle(self, *args, **options):
+        counters = reconcile_user_stats()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled user statistics for {counters['total_users']} users"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('common', '0002_address_lat_address_long'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'id'], name='accounts_user_created_id_idx'),
+        ),
+    ]
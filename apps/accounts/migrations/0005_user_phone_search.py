@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:18
+
+from django.db import migrations, models
+
+
+def backfill_phone_digits(apps, schema_editor):
+    from apps.accounts.search import normalize_phone
+    User = apps.get_model('accounts', 'User')
+    users = []
+    for pk, phone_number in User.objects.values_list('id', 'phone_number').iterator(chunk_size=2000):
+        digits = normalize_phone(phone_number)
+        users.append(User(pk=pk, phone_digits=digits, phone_digits_reversed=digits[::-1]))
+        if len(users) == 2000:
+            User.objects.bulk_update(users, ['phone_digits', 'phone_digits_reversed'], batch_size=500)
+            users = []
+    User.objects.bulk_update(users, ['phone_digits', 'phone_digits_reversed'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    from apps.accounts.search import install_user_search_index
+    install_user_search_index(schema_editor.connection, rebuild=True)
+
+
+def drop_search_index(apps, schema_editor):
+    from apps.accounts.search import remove_user_search_index
+    remove_user_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_digits',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='phone_digits_reversed',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(backfill_phone_digits, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
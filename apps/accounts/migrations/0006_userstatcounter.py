@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_phone_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Name')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Value')),
+            ],
+            options={
+                'verbose_name': 'User Statistics Counter',
+                'verbose_name_plural': 'User Statistics Counters',
+            },
+        ),
+    ]
@@ -1,9 +1,12 @@
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from apps.common.models_base import BaseModel
 from apps.common.utils import validate_phone_number
+from .hashing import run_hasher
 from .managers import UserManager
+from .search import normalize_phone
 
 class User(AbstractBaseUser, PermissionsMixin, BaseModel):
     """Custom User model with phone number authentication"""
@@ -21,6 +24,10 @@ class User(AbstractBaseUser, PermissionsMixin, BaseModel):
         unique=True,
         validators=[validate_phone_number]
     )
+    # Digits of phone_number, as is and reversed, for indexed prefix and
+    # suffix search (see apps.accounts.search)
+    phone_digits = models.CharField(max_length=15, db_index=True, editable=False, default='')
+    phone_digits_reversed = models.CharField(max_length=15, db_index=True, editable=False, default='')
     full_name = models.CharField(_('Full name'), max_length=255, blank=True)
     profile_photo = models.ImageField(
         _('Profile photo'),
@@ -53,10 +60,23 @@ class User(AbstractBaseUser, PermissionsMixin, BaseModel):
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='accounts_user_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.phone_number
 
+    def save(self, *args, **kwargs):
+        # Skipped when phone_number is deferred, it cannot have changed
+        if 'phone_number' in self.__dict__:
+            self.phone_digits = normalize_phone(self.phone_number)
+            self.phone_digits_reversed = self.phone_digits[::-1]
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'phone_number' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'phone_digits', 'phone_digits_reversed'}
+        super().save(*args, **kwargs)
+
     @property
     def is_super_admin(self):
         return self.role == 'super_admin'
@@ -69,6 +89,29 @@ class User(AbstractBaseUser, PermissionsMixin, BaseModel):
     def is_seller(self):
         return self.role == 'seller'
 
+    def set_password(self, raw_password):
+        # Hashed on the bounded pool, see apps.accounts.hashing
+        self.password = run_hasher(make_password, raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        upgrade = []
+        correct = run_hasher(check_password, raw_password, self.password, upgrade.append)
+        if upgrade:
+            # Rehash with the preferred hasher, as AbstractBaseUser does
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return correct
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Users built from an auth snapshot defer most fields: load all of
+        # them on first access instead of one query per field
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, **kwargs)
+
 class SellerProfile(BaseModel):
     """Extended profile for sellers"""
     user = models.OneToOneField(
@@ -92,3 +135,27 @@ class SellerProfile(BaseModel):
 
     def __str__(self):
         return f"{self.user.phone_number} - {self.project_name}"
+
+class RevokedToken(models.Model):
+    """Revoked JWT id, kept until the token would have expired anyway"""
+    jti = models.CharField(_('Token id'), max_length=255, unique=True)
+    expires_at = models.DateTimeField(_('Expires at'), db_index=True)
+
+    class Meta:
+        verbose_name = _('Revoked Token')
+        verbose_name_plural = _('Revoked Tokens')
+
+    def __str__(self):
+        return self.jti
+
+class UserStatCounter(models.Model):
+    """Dashboard statistics counter, kept by signals, see apps.accounts.stats"""
+    name = models.CharField(_('Name'), max_length=50, unique=True)
+    value = models.BigIntegerField(_('Value'), default=0)
+
+    class Meta:
+        verbose_name = _('User Statistics Counter')
+        verbose_name_plural = _('User Statistics Counters')
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
@@ -0,0 +1,143 @@
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+# Seconds a process may go without seeing revocations made by other processes
+SYNC_INTERVAL = getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 1.0)
+
+# Expired entries are deleted at most this often, by whichever process revokes
+PRUNE_INTERVAL = 60 * 60
+
+# Each process rebuilds its filter this often, dropping ids pruned elsewhere
+REBUILD_INTERVAL = PRUNE_INTERVAL
+
+FALSE_POSITIVE_RATE = 0.001
+MIN_CAPACITY = 10000
+
+# Rows re-read below the last seen id on each sync, covering inserts that
+# committed out of id order
+SYNC_OVERLAP = 100
+
+PRUNE_KEY = 'accounts:revoked_tokens:pruned'
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for capacity entries"""
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+class RevocationStore:
+    """
+    Answers "is this JWT id revoked?" mostly from process memory.
+
+    Revoked ids live in the RevokedToken table. Each process keeps a Bloom
+    filter of the unexpired ones: a miss means not revoked and costs no
+    query, a hit is confirmed against the table. At most every
+    SYNC_INTERVAL seconds a process reads the highest id in the table and
+    adds any new rows, so revocations reach every worker without relying
+    on a shared cache. The filter is rebuilt when it outgrows its capacity
+    and every REBUILD_INTERVAL, which drops the pruned ids.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._capacity = 0
+        self._count = 0
+        self._last_id = 0
+        self._checked = 0.0
+        self._loaded = 0.0
+
+    def sync(self, force=False):
+        from .models import RevokedToken
+
+        now = time.monotonic()
+        if not force and self._filter is not None and now - self._checked < SYNC_INTERVAL:
+            return
+        last_id = RevokedToken.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        with self._lock:
+            self._checked = now
+            if self._filter is None or now - self._loaded >= REBUILD_INTERVAL:
+                self.load()
+            elif last_id != self._last_id:
+                self.load_since(self._last_id - SYNC_OVERLAP)
+
+    def load(self):
+        """Rebuild the filter from every unexpired row"""
+        from .models import RevokedToken
+
+        last_id = RevokedToken.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        rows = list(RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True))
+        self._capacity = max(MIN_CAPACITY, len(rows) * 2)
+        self._filter = BloomFilter(self._capacity)
+        for jti in rows:
+            self._filter.add(jti)
+        self._count = len(rows)
+        self._last_id = last_id
+        self._loaded = time.monotonic()
+
+    def load_since(self, last_id):
+        from .models import RevokedToken
+
+        rows = list(RevokedToken.objects.filter(id__gt=last_id).values_list('id', 'jti'))
+        added = sum(1 for row_id, _ in rows if row_id > self._last_id)
+        if self._count + added > self._capacity:
+            # Past capacity the false positive rate, and the confirming queries, climb
+            self.load()
+            return
+        for row_id, jti in rows:
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, row_id)
+        self._count += added
+
+    def is_revoked(self, jti):
+        from .models import RevokedToken
+
+        self.sync()
+        if jti not in self._filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """Record jti as revoked until expires_at"""
+        from .models import RevokedToken
+
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)], ignore_conflicts=True
+        )
+        self.sync()
+        with self._lock:
+            self._filter.add(jti)
+            self._count += 1
+        if cache.add(PRUNE_KEY, 1, PRUNE_INTERVAL):
+            self.prune()
+
+    def prune(self, now=None):
+        """Delete entries whose tokens have expired; returns how many"""
+        from .models import RevokedToken
+
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+        return deleted
+
+revocations = RevocationStore()
@@ -0,0 +1,123 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Trigram indexes cannot answer shorter name terms
+MIN_NAME_TERM = 3
+
+# Query terms beyond this are ignored to keep MATCH expressions cheap
+MAX_SEARCH_TERMS = 4
+
+# Input made only of these characters is read as a phone number
+PHONE_QUERY = re.compile(r'^[\d\s()+-]+$')
+
+SQLITE_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS accounts_user_name_fts USING fts5(
+        full_name, content='accounts_user', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_name_fts_insert AFTER INSERT ON accounts_user BEGIN
+        INSERT INTO accounts_user_name_fts(rowid, full_name) VALUES (new.id, new.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_name_fts_delete AFTER DELETE ON accounts_user BEGIN
+        INSERT INTO accounts_user_name_fts(accounts_user_name_fts, rowid, full_name)
+        VALUES ('delete', old.id, old.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS accounts_user_name_fts_update
+    AFTER UPDATE OF full_name ON accounts_user BEGIN
+        INSERT INTO accounts_user_name_fts(accounts_user_name_fts, rowid, full_name)
+        VALUES ('delete', old.id, old.full_name);
+        INSERT INTO accounts_user_name_fts(rowid, full_name) VALUES (new.id, new.full_name);
+    END
+    """,
+]
+
+# pg_trgm lets the planner answer full_name ILIKE '%term%' from the index
+POSTGRESQL_INDEX_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE INDEX IF NOT EXISTS accounts_user_full_name_trgm_idx
+    ON accounts_user USING GIN (full_name gin_trgm_ops)
+    """,
+]
+
+def install_user_search_index(conn, rebuild=False):
+    """
+    Create the user name trigram index if it is missing.
+
+    Safe to run repeatedly. On SQLite the sync triggers are dropped whenever
+    Django remakes the accounts_user table, so this also runs after every
+    migrate.
+    """
+    if conn.vendor == 'sqlite':
+        statements = SQLITE_INDEX_SQL
+    elif conn.vendor == 'postgresql':
+        statements = POSTGRESQL_INDEX_SQL
+    else:
+        return
+
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+        if rebuild and conn.vendor == 'sqlite':
+            cursor.execute("INSERT INTO accounts_user_name_fts(accounts_user_name_fts) VALUES ('rebuild')")
+
+def remove_user_search_index(conn):
+    """Drop the user name trigram index"""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for name in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS accounts_user_name_fts_{name}')
+            cursor.execute('DROP TABLE IF EXISTS accounts_user_name_fts')
+        elif conn.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS accounts_user_full_name_trgm_idx')
+
+def normalize_phone(phone_number):
+    """Digits of a phone number, without '+' or separators"""
+    return re.sub(r'\D', '', phone_number or '')
+
+def prefix_range(field, prefix):
+    """Lookups for values starting with prefix, as a range any B-tree index answers"""
+    return {f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+def search_users(queryset, text, conn=connection):
+    """
+    Restrict a User queryset to matches of admin search input.
+
+    Phone-like input matches numbers starting or ending with its digits,
+    e.g. '+99890' or the last four digits, through the phone_digits and
+    phone_digits_reversed indexes. Other input matches names containing
+    every term: terms of at least MIN_NAME_TERM characters through the
+    trigram index, shorter ones with icontains.
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset
+
+    digits = normalize_phone(text)
+    if digits and PHONE_QUERY.match(text):
+        return queryset.filter(
+            Q(**prefix_range('phone_digits', digits)) |
+            Q(**prefix_range('phone_digits_reversed', digits[::-1]))
+        )
+
+    terms = text.lower().split()[:MAX_SEARCH_TERMS]
+    indexed = [term for term in terms if len(term) >= MIN_NAME_TERM]
+    if indexed and conn.vendor == 'sqlite':
+        match = ' AND '.join('"%s"' % term.replace('"', '""') for term in indexed)
+        queryset = queryset.filter(
+            id__in=RawSQL('SELECT rowid FROM accounts_user_name_fts WHERE accounts_user_name_fts MATCH %s', [match])
+        )
+        terms = [term for term in terms if term not in indexed]
+
+    # Too short for trigrams, or no index on this backend
+    for term in terms:
+        queryset = queryset.filter(full_name__icontains=term)
+    return queryset
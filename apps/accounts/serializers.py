@@ -1,8 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from apps.common.models import Address
 from .models import User, SellerProfile
+from .tokens import RevocableRefreshToken
 
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
@@ -114,6 +118,23 @@ class LoginResponseSerializer(serializers.Serializer):
     refresh_token = serializers.CharField()
     user = UserProfileSerializer()
 
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer whose rotated tokens are revoked, not just replaced"""
+    token_class = RevocableRefreshToken
+
+class LogoutSerializer(serializers.Serializer):
+    refresh_token = serializers.CharField(required=False)
+    
+    def validate_refresh_token(self, value):
+        try:
+            token = RevocableRefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+        user = self.context['request'].user
+        if str(token.get(api_settings.USER_ID_CLAIM)) != str(user.pk):
+            raise serializers.ValidationError(_('Token belongs to another user'))
+        return token
+
 class AdminUserSerializer(serializers.ModelSerializer):
     """Serializer for admin user management"""
     address = AddressSerializer(read_only=True)
@@ -0,0 +1,63 @@
+from collections import Counter
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_user_snapshot
+from .models import SellerProfile, User
+from .stats import adjust_user_stats, invalidate_user_stats, user_deltas, user_state
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.pk)
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    # Loaded values, to tell what a later save changed without a query
+    instance._stats_state = user_state(instance)
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, **kwargs):
+    old, new = instance._stats_state, user_state(instance)
+    if created:
+        adjust_user_stats(user_deltas(new, 1))
+    elif old != new:
+        if old is None or new is None:
+            invalidate_user_stats()
+        else:
+            deltas = Counter(user_deltas(new, 1))
+            deltas.update(user_deltas(old, -1))
+            adjust_user_stats(deltas)
+    instance._stats_state = new
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    state = user_state(instance)
+    if state is None:
+        invalidate_user_stats()
+    else:
+        adjust_user_stats(user_deltas(state, -1))
+
+def seller_deltas(is_approved, sign):
+    return {'approved_sellers' if is_approved else 'pending_sellers': sign}
+
+@receiver(post_init, sender=SellerProfile)
+def remember_seller_state(sender, instance, **kwargs):
+    instance._stats_state = instance.__dict__.get('is_approved')
+
+@receiver(post_save, sender=SellerProfile)
+def count_saved_seller(sender, instance, created, **kwargs):
+    old, new = instance._stats_state, instance.__dict__.get('is_approved')
+    if created:
+        adjust_user_stats(seller_deltas(new, 1))
+    elif old != new:
+        if old is None or new is None:
+            invalidate_user_stats()
+        else:
+            adjust_user_stats({**seller_deltas(old, -1), **seller_deltas(new, 1)})
+    instance._stats_state = new
+
+@receiver(post_delete, sender=SellerProfile)
+def count_deleted_seller(sender, instance, **kwargs):
+    if 'is_approved' in instance.__dict__:
+        adjust_user_stats(seller_deltas(instance.is_approved, -1))
+    else:
+        invalidate_user_stats()
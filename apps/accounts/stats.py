@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+def get_roles():
+    from .models import User
+
+    return [role for role, _ in User.ROLE_CHOICES]
+
+def get_counter_names():
+    return (
+        ['total_users', 'active_users'] +
+        [f'role:{role}' for role in get_roles()] +
+        ['pending_sellers', 'approved_sellers']
+    )
+
+def compute_counters():
+    """Every counter from one conditional-aggregation query per table"""
+    from .models import SellerProfile, User
+
+    counters = User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        **{f'role:{role}': Count('id', filter=Q(role=role)) for role in get_roles()}
+    )
+    counters.update(SellerProfile.objects.aggregate(
+        pending_sellers=Count('id', filter=Q(is_approved=False)),
+        approved_sellers=Count('id', filter=Q(is_approved=True)),
+    ))
+    return counters
+
+def reconcile_user_stats():
+    """Overwrite the stored counters with fresh counts; returns them"""
+    from .models import UserStatCounter
+
+    counters = compute_counters()
+    with transaction.atomic():
+        UserStatCounter.objects.all().delete()
+        UserStatCounter.objects.bulk_create(
+            [UserStatCounter(name=name, value=value) for name, value in counters.items()]
+        )
+    return counters
+
+def adjust_user_stats(deltas):
+    """Apply {counter: delta} once the current transaction commits"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def apply():
+        from .models import UserStatCounter
+
+        # A missing counter is left missing: the next read reconciles all of them
+        with transaction.atomic():
+            for name, delta in deltas.items():
+                UserStatCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+    transaction.on_commit(apply)
+
+def invalidate_user_stats():
+    """Force the next read to reconcile, for changes whose delta is unknown"""
+    from .models import UserStatCounter
+
+    UserStatCounter.objects.filter(name='total_users').delete()
+
+def get_user_stats():
+    """Dashboard statistics from the stored counters, independent of user count"""
+    from .models import UserStatCounter
+
+    names = get_counter_names()
+    counters = dict(UserStatCounter.objects.filter(name__in=names).values_list('name', 'value'))
+    if len(counters) < len(names):
+        counters = reconcile_user_stats()
+    return {
+        'total_users': counters['total_users'],
+        'active_users': counters['active_users'],
+        'users_by_role': {role: counters[f'role:{role}'] for role in get_roles()},
+        'pending_sellers': counters['pending_sellers'],
+        'approved_sellers': counters['approved_sellers'],
+    }
+
+def user_state(user):
+    """(is_active, role) as loaded, None when either was deferred"""
+    values = user.__dict__
+    if 'is_active' not in values or 'role' not in values:
+        return None
+    return values['is_active'], values['role']
+
+def user_deltas(state, sign):
+    is_active, role = state
+    return {'total_users': sign, 'active_users': sign if is_active else 0, f'role:{role}': sign}
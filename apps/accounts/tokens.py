@@ -0,0 +1,27 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .revocation import revocations
+
+class RevocableTokenMixin:
+    """Rejects tokens whose id was revoked, see apps.accounts.revocation"""
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if revocations.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is revoked'))
+
+    def revoke(self):
+        revocations.revoke(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+
+    def blacklist(self):
+        # Called by TokenRefreshSerializer when BLACKLIST_AFTER_ROTATION is set
+        self.revoke()
+
+class RevocableAccessToken(RevocableTokenMixin, AccessToken):
+    pass
+
+class RevocableRefreshToken(RevocableTokenMixin, RefreshToken):
+    access_token_class = RevocableAccessToken
@@ -4,7 +4,7 @@ from .views import (
     LoginView, RegisterView, UserProfileView, 
     SellerRegistrationView, logout_view,
     AdminUserListView, AdminUserDetailView, SellerApprovalView,
-    PendingSellersView, UserStatsView
+    PendingSellersView, UserStatsView, AdminUserExportView
 )
 
 app_name = 'accounts'
@@ -22,6 +22,7 @@ urlpatterns = [
     
     # Admin user management
     path('admin/users/', AdminUserListView.as_view(), name='admin_users'),
+    path('admin/users/export/', AdminUserExportView.as_view(), name='admin_users_export'),
     path('admin/users/<int:pk>/', AdminUserDetailView.as_view(), name='admin_user_detail'),
     path('admin/users/stats/', UserStatsView.as_view(), name='user_stats'),
     
@@ -3,17 +3,22 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.generics import RetrieveUpdateAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
+from apps.common.exports import EXPORT_FORMATS, export_response
+from apps.common.pagination import KeysetResultsSetPagination
 from apps.common.permissions import IsAdmin, IsSuperAdmin
+from .exports import USER_EXPORT_COLUMNS, iter_user_rows
+from .filters import UserFilter
 from .models import User, SellerProfile
 from .serializers import (
     UserLoginSerializer, UserRegisterSerializer, UserProfileSerializer,
     UserProfileEditSerializer, SellerRegistrationSerializer, LoginResponseSerializer,
-    AdminUserSerializer, AdminUserCreateSerializer, SellerApprovalSerializer
+    AdminUserSerializer, AdminUserCreateSerializer, SellerApprovalSerializer, LogoutSerializer
 )
+from .search import search_users
+from .stats import get_user_stats
+from .tokens import RevocableRefreshToken
 
 User = get_user_model()
 
@@ -26,7 +31,8 @@ class LoginView(APIView):
         responses={
             200: LoginResponseSerializer,
             401: OpenApiResponse(description='Invalid credentials'),
-            429: OpenApiResponse(description='Too many requests')
+            429: OpenApiResponse(description='Too many requests'),
+            503: OpenApiResponse(description='Password hashing pool saturated, retry shortly')
         },
         summary='User login',
         description='Authenticate user and return access tokens'
@@ -36,7 +42,7 @@ class LoginView(APIView):
         
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
+            refresh = RevocableRefreshToken.for_user(user)
             
             response_data = {
                 'access_token': str(refresh.access_token),
@@ -56,7 +62,8 @@ class RegisterView(APIView):
         request=UserRegisterSerializer,
         responses={
             201: LoginResponseSerializer,
-            400: OpenApiResponse(description='Validation errors')
+            400: OpenApiResponse(description='Validation errors'),
+            503: OpenApiResponse(description='Password hashing pool saturated, retry shortly')
         },
         summary='User registration',
         description='Register new user and return access tokens'
@@ -66,7 +73,7 @@ class RegisterView(APIView):
         
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = RevocableRefreshToken.for_user(user)
             
             response_data = {
                 'access_token': str(refresh.access_token),
@@ -169,6 +176,7 @@ class SellerRegistrationView(APIView):
 class AdminUserListView(ListCreateAPIView):
     """Admin endpoint to list and create users"""
     permission_classes = [IsAdmin]
+    pagination_class = KeysetResultsSetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -183,20 +191,18 @@ class AdminUserListView(ListCreateAPIView):
         if role:
             queryset = queryset.filter(role=role)
         
-        # Search by phone number or name
+        # Search by phone number prefix or suffix, or by name
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(phone_number__icontains=search) | 
-                Q(full_name__icontains=search)
-            )
+            queryset = search_users(queryset, search)
         
         return queryset
     
     @extend_schema(
         parameters=[
             OpenApiParameter('role', str, description='Filter by user role'),
-            OpenApiParameter('search', str, description='Search by phone number or name'),
+            OpenApiParameter('search', str, description='Phone number prefix or last digits, or name terms of 3+ characters'),
+            OpenApiParameter('cursor', str, description='Keyset pagination token; pass empty for the first page'),
         ],
         responses={200: AdminUserSerializer(many=True)},
         summary='List all users',
@@ -214,6 +220,39 @@ class AdminUserListView(ListCreateAPIView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
+class AdminUserExportView(APIView):
+    """Admin export of users as a streamed CSV or NDJSON file"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('file_format', str, description='csv (default) or ndjson'),
+            OpenApiParameter('role', str, description='Filter by user role'),
+            OpenApiParameter('is_active', bool, description='Filter by active status'),
+            OpenApiParameter('is_verified', bool, description='Filter by verified status'),
+            OpenApiParameter('created_after', str, description='Created at or after this datetime'),
+            OpenApiParameter('created_before', str, description='Created at or before this datetime'),
+        ],
+        responses={
+            200: OpenApiResponse(description='Streamed file with one row per user'),
+            400: OpenApiResponse(description='Invalid filter or format'),
+        },
+        summary='Export users',
+        description='Admin endpoint streaming all matching users with their seller profile, in id order'
+    )
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'file_format': f'Choose one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filterset = UserFilter(request.query_params, queryset=User.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(iter_user_rows(filterset.qs), USER_EXPORT_COLUMNS, file_format, 'users')
+
 class AdminUserDetailView(RetrieveUpdateDestroyAPIView):
     """Admin endpoint to manage specific user"""
     queryset = User.objects.all()
@@ -321,30 +360,31 @@ class UserStatsView(APIView):
         description='Admin endpoint to get user statistics by role and status'
     )
     def get(self, request):
-        stats = {
-            'total_users': User.objects.count(),
-            'active_users': User.objects.filter(is_active=True).count(),
-            'users_by_role': {
-                'super_admin': User.objects.filter(role='super_admin').count(),
-                'admin': User.objects.filter(role='admin').count(),
-                'seller': User.objects.filter(role='seller').count(),
-                'user': User.objects.filter(role='user').count(),
-            },
-            'pending_sellers': SellerProfile.objects.filter(is_approved=False).count(),
-            'approved_sellers': SellerProfile.objects.filter(is_approved=True).count(),
-        }
-        
-        return Response(stats, status=status.HTTP_200_OK)
+        # Stored counters kept current by signals, see apps.accounts.stats
+        return Response(get_user_stats(), status=status.HTTP_200_OK)
 
 @extend_schema(
-    responses={200: OpenApiResponse(description='Logout successful')},
+    request=LogoutSerializer,
+    responses={
+        200: OpenApiResponse(description='Logout successful'),
+        400: OpenApiResponse(description='Invalid refresh token')
+    },
     summary='User logout',
-    description='Logout current user (client-side token removal)'
+    description='Revoke the current access token and, when given, the refresh token'
 )
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def logout_view(request):
-    """Logout endpoint (client handles token removal)"""
+    """Logout endpoint, revokes the tokens server-side"""
+    serializer = LogoutSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    
+    refresh = serializer.validated_data.get('refresh_token')
+    if refresh is not None:
+        refresh.revoke()
+    if hasattr(request.auth, 'revoke'):
+        request.auth.revoke()
+    
     return Response(
         {'message': 'Logout successful'}, 
         status=status.HTTP_200_OK
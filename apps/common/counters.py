@@ -0,0 +1,217 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_counters = []
+
+class WriteBehindBuffer:
+    """
+    Base for buffers that collect writes in process memory.
+
+    A flush runs inline on the first write after flush_interval seconds or
+    once max_pending entries are buffered, and again at interpreter exit.
+
+    With background=True the request thread never writes: a daemon thread
+    flushes every flush_interval seconds, or as soon as max_pending entries
+    are buffered. Setting COUNTER_BACKGROUND_FLUSH = False turns that off
+    and falls back to inline flushes, e.g. for tests.
+
+    Buffers are per process, not in a shared store: the configured cache is
+    process-local too, so keeping them there would add a round trip
+    without making them visible to other workers. Each process sees only
+    its own pending writes, and a process killed without running atexit
+    (SIGKILL, OOM) loses what it buffered since its last flush, at most
+    flush_interval seconds of writes.
+    """
+
+    def __init__(self, model, flush_interval=None, max_pending=None, background=False):
+        self.model_label = model
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'COUNTER_FLUSH_INTERVAL', 10
+        )
+        self.max_pending = max_pending if max_pending is not None else getattr(
+            settings, 'COUNTER_MAX_PENDING', 1000
+        )
+        self.background = background
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wake = threading.Event()
+        self._flusher = None
+        _counters.append(self)
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def __str__(self):
+        return self.model_label
+
+    def flush(self):
+        raise NotImplementedError
+
+    def _buffered(self, size):
+        """Flush as needed after a write left size entries buffered"""
+        full = size >= self.max_pending
+        if self.background and getattr(settings, 'COUNTER_BACKGROUND_FLUSH', True):
+            self._start_flusher()
+            if full:
+                self._wake.set()
+            return None
+        if full or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return None
+
+    def _start_flusher(self):
+        # Started lazily so forked workers get their own thread
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._run_flusher, daemon=True, name=f'{self} flusher'
+                )
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush %s buffer', self)
+            finally:
+                close_old_connections()
+
+class BufferedCounter(WriteBehindBuffer):
+    """
+    Write-behind counter for a numeric model column.
+
+    Increments are summed in process memory and written in batches as
+    ``UPDATE ... SET field = field + n``, one statement per distinct n, so
+    hot rows take one row lock per flush instead of one per hit and no
+    increment is lost to read-modify-write races.
+    """
+
+    def __init__(self, model, field, key_field='pk', flush_interval=None,
+                 max_pending=None, touch_updated_at=False, on_flush=None,
+                 background=False):
+        super().__init__(model, flush_interval, max_pending, background)
+        self.field = field
+        self.key_field = key_field
+        self.touch_updated_at = touch_updated_at
+        self.on_flush = on_flush
+        self._pending = defaultdict(int)
+
+    def __str__(self):
+        return f'{self.model_label}.{self.field}'
+
+    def incr(self, key, amount=1):
+        """Buffer an increment; returns what was flushed if this triggered a flush"""
+        with self._lock:
+            self._pending[key] += amount
+            size = len(self._pending)
+        return self._buffered(size) or {}
+
+    def pending(self, key):
+        """Increments for key not yet written to the database"""
+        return self._pending.get(key, 0)
+
+    def flush(self):
+        """Write buffered increments; returns the {key: amount} that was applied"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._last_flush = time.monotonic()
+        if not pending:
+            return {}
+
+        by_amount = defaultdict(list)
+        for key, amount in pending.items():
+            by_amount[amount].append(key)
+
+        updates = {}
+        if self.touch_updated_at:
+            updates['updated_at'] = timezone.now()
+        try:
+            with transaction.atomic():
+                for amount, keys in by_amount.items():
+                    self.model.objects.filter(**{f'{self.key_field}__in': keys}).update(
+                        **{self.field: F(self.field) + amount}, **updates
+                    )
+        except Exception:
+            # Put the increments back so the next flush retries them
+            with self._lock:
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+            raise
+
+        if self.on_flush is not None:
+            self.on_flush(pending)
+        return pending
+
+class BufferedInserts(WriteBehindBuffer):
+    """
+    Write-behind queue of new rows, saved with bulk_create in batches.
+
+    A batch that fails to insert is retried once with the next flush and
+    then dropped, so one bad row cannot wedge the queue.
+    """
+
+    def __init__(self, model, flush_interval=None, max_pending=None,
+                 batch_size=500, background=False):
+        super().__init__(model, flush_interval, max_pending, background)
+        self.batch_size = batch_size
+        self._pending = []
+        self._retry = []
+
+    def add(self, **fields):
+        """Queue one row; returns how many rows were written if this triggered a flush"""
+        with self._lock:
+            self._pending.append(fields)
+            size = len(self._pending)
+        return self._buffered(size) or 0
+
+    def pending(self):
+        """Number of queued rows not yet written"""
+        return len(self._pending) + len(self._retry)
+
+    def flush(self):
+        """Insert queued rows; returns how many were written"""
+        with self._lock:
+            retry, self._retry = self._retry, []
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending and not retry:
+            return 0
+
+        model = self.model
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**fields) for fields in retry + pending], batch_size=self.batch_size
+                )
+        except Exception:
+            with self._lock:
+                self._retry = pending
+            if retry:
+                logger.error('Dropped %d queued %s rows after a failed retry', len(retry), self)
+            raise
+        return len(retry) + len(pending)
+
+def flush_all_counters():
+    for counter in _counters:
+        try:
+            counter.flush()
+        except Exception:
+            logger.exception('Failed to flush %s buffer', counter)
+
+atexit.register(flush_all_counters)
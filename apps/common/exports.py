@@ -0,0 +1,70 @@
+import csv
+import json
+from datetime import date, datetime
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows read per database round trip, and per related-data lookup
+CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+class Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+def chunked(iterable, size):
+    """Lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def render_rows(rows, columns, file_format):
+    """
+    Encode dict rows one line at a time.
+
+    Nothing is buffered beyond the current row, so memory stays flat
+    however many rows the iterable produces.
+    """
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow([csv_value(row[column]) for column in columns])
+    else:
+        for row in rows:
+            yield json.dumps(
+                {column: row[column] for column in columns},
+                cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+
+def export_response(rows, columns, file_format, filename):
+    """StreamingHttpResponse downloading rows as filename.<file_format>"""
+    response = StreamingHttpResponse(
+        render_rows(rows, columns, file_format), content_type=EXPORT_FORMATS[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+def write_export(rows, columns, file_format, stream):
+    """Write rows to a text stream; returns how many were written"""
+    count = -1 if file_format == 'csv' else 0
+    for line in render_rows(rows, columns, file_format):
+        stream.write(line)
+        count += 1
+    return count
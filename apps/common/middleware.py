@@ -1,9 +1,11 @@
+import math
 import time
 import logging
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
+from rest_framework.views import APIView
+from .ratelimit import check_request, get_client_ip, get_request_cost
 
 logger = logging.getLogger(__name__)
 
@@ -32,50 +34,37 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         return response
 
 class RateLimitMiddleware(MiddlewareMixin):
-    """Rate limiting middleware"""
+    """
+    Rate limiting for requests not handled by a DRF view.
+
+    DRF views are charged by RateLimitThrottle once the user is
+    authenticated, so they are skipped here and never charged twice.
+    """
     
-    def process_request(self, request):
-        if self.should_skip_rate_limit(request):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.should_skip_rate_limit(request, view_func):
             return None
-            
-        client_ip = self.get_client_ip(request)
-        user_id = getattr(request.user, 'id', None) if hasattr(request, 'user') and request.user.is_authenticated else None
-        
-        # Different limits for authenticated vs anonymous users
-        if user_id:
-            rate_limit_key = f"rate_limit_user_{user_id}"
-            max_requests = 1000  # 1000 requests per hour for authenticated users
-        else:
-            rate_limit_key = f"rate_limit_ip_{client_ip}"
-            max_requests = 100   # 100 requests per hour for anonymous users
-        
-        current_requests = cache.get(rate_limit_key, 0)
         
-        if current_requests >= max_requests:
-            logger.warning(f"Rate limit exceeded for {'user ' + str(user_id) if user_id else 'IP ' + client_ip}")
-            return JsonResponse(
+        user = getattr(request, 'user', None)
+        allowed, retry_after = check_request(request, user, get_request_cost(request))
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {request.path} from {get_client_ip(request)}")
+            response = JsonResponse(
                 {'error': 'Rate limit exceeded. Try again later.'},
                 status=429
             )
-        
-        # Increment counter
-        cache.set(rate_limit_key, current_requests + 1, 3600)  # 1 hour expiry
+            response['Retry-After'] = str(math.ceil(retry_after))
+            return response
         
         return None
     
-    def should_skip_rate_limit(self, request):
-        """Skip rate limiting for certain paths"""
+    def should_skip_rate_limit(self, request, view_func):
+        """Skip rate limiting for certain paths and for DRF views"""
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is not None and issubclass(view_class, APIView):
+            return True
         skip_paths = ['/admin/', '/api/docs/', '/api/schema/']
         return any(request.path.startswith(path) for path in skip_paths)
-    
-    def get_client_ip(self, request):
-        """Get client IP address"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
 
 class RequestLoggingMiddleware(MiddlewareMixin):
     """Log API requests for security monitoring"""
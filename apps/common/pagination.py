@@ -1,6 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from rest_framework.exceptions import NotFound, ValidationError as RequestValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
 from collections import OrderedDict
+from types import SimpleNamespace
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
@@ -19,3 +27,165 @@ class LargeResultsSetPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
+
+class SearchResultsSetPagination(LimitOffsetPagination):
+    """Limit/offset pagination for results served from in-memory indexes"""
+    default_limit = 10
+    max_limit = 50
+
+    def paginate_results(self, request, fetch):
+        """Call fetch(limit, offset) -> (count, rows) and paginate its window"""
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.count, results = fetch(self.limit, self.offset)
+        return results
+
+class KeysetResultsSetPagination(StandardResultsSetPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Without a ``cursor`` parameter responses are identical to
+    StandardResultsSetPagination. Passing ``?cursor=`` (empty for the first
+    page) switches to keyset mode: no COUNT(*) and no OFFSET, the page is
+    fetched with a ``(field, id) < (value, last_id)`` seek on the active
+    ordering, and ``next`` carries an opaque token for the following page.
+    Only the first ordering field is used and it must be a non-null local
+    column, with the primary key appended as tie-breaker. Querysets ordered
+    by an annotation, such as search relevance, cannot be seeked and are
+    rejected; pass an explicit ordering to page them by cursor.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    ranked_cursor_message = 'Cursor pagination needs an explicit ordering for ranked results'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset_mode = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset_mode = True
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_keyset_ordering(request, queryset, view)
+        ordering = self.get_order_by()
+        queryset = queryset.order_by(*ordering)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(*position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page_results = results[:self.page_size]
+        return self.page_results
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_keyset_ordering(self, request, queryset, view):
+        """Resolve the (field, descending) pair the seek predicate runs on"""
+        current = queryset.query.order_by
+        if current and isinstance(current[0], str) and current[0].lstrip('-') in queryset.query.annotations:
+            # Offset mode keeps this order; seeking on another field would change it
+            raise RequestValidationError({self.cursor_query_param: [self.ranked_cursor_message]})
+
+        ordering = None
+        if view is not None:
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+
+        pk_name = queryset.model._meta.pk.name
+        for item in ordering or []:
+            if not isinstance(item, str):
+                continue
+            name = item.lstrip('-')
+            if name in ('pk', pk_name):
+                return 'pk', item.startswith('-')
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.is_relation and not field.null:
+                return field.attname, item.startswith('-')
+            break
+        return 'pk', True
+
+    def get_order_by(self):
+        prefix = '-' if self.descending else ''
+        if self.field == 'pk':
+            return [prefix + 'pk']
+        return [prefix + self.field, prefix + 'pk']
+
+    def get_seek_filter(self, value, pk):
+        lookup = 'lt' if self.descending else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{lookup}': pk})
+        return (
+            Q(**{f'{self.field}__{lookup}': value}) |
+            Q(**{self.field: value, f'pk__{lookup}': pk})
+        )
+
+    def encode_cursor(self, obj):
+        opts = self.model._meta
+        if isinstance(obj, dict):
+            # Row of a .values() queryset
+            obj = SimpleNamespace(**obj)
+        value = None
+        if self.field != 'pk':
+            value = opts.get_field(self.field).value_to_string(obj)
+        payload = {
+            'o': ('-' if self.descending else '') + self.field,
+            'v': value,
+            'pk': getattr(obj, opts.pk.attname),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            ordering = payload['o']
+            pk = model._meta.pk.to_python(payload['pk'])
+            value = payload['v']
+            if self.field != 'pk':
+                value = model._meta.get_field(self.field).to_python(value)
+        except (TypeError, ValueError, KeyError, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Keyset columns are never null, so a null can only come from a forged token
+        if pk is None or (value is None and self.field != 'pk'):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A token minted for a different ordering cannot seek this one
+        if ordering != ('-' if self.descending else '') + self.field:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page_results[-1])
+        )
+
+    def get_previous_link(self):
+        if getattr(self, 'keyset_mode', False):
+            return None
+        return super().get_previous_link()
@@ -0,0 +1,169 @@
+import ipaddress
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+
+# Seconds per unit accepted in rates such as '100/hour'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_backends = {}
+
+def parse_rate(rate):
+    """'100/hour' -> (100, 3600)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+class CacheBackend:
+    """
+    Window counters kept in a Django cache with atomic incr.
+
+    Set RATE_LIMIT_CACHE to the alias of a cache shared by all workers
+    (Redis, Memcached); with the per-process LocMemCache every worker
+    enforces its own limit. Counts of the previous window no longer
+    change, so they are read once per window and kept in process memory:
+    a request usually costs a single incr.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+        self._previous = {}
+        self._previous_window = None
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, cost, timeout):
+        """Add cost to the counter of window; returns (previous count, current count)"""
+        current_key = f'{key}:{window}'
+        try:
+            current = self.cache.incr(current_key, cost)
+        except ValueError:
+            # First hit of the window, or lost a race to create it
+            if self.cache.add(current_key, cost, timeout):
+                current = cost
+            else:
+                current = self.cache.incr(current_key, cost)
+        return self.get_previous(key, window), current
+
+    def get_previous(self, key, window):
+        with self._lock:
+            if self._previous_window != window:
+                self._previous, self._previous_window = {}, window
+            if key in self._previous:
+                return self._previous[key]
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        with self._lock:
+            if self._previous_window == window:
+                self._previous[key] = previous
+        return previous
+
+    def undo(self, key, window, cost):
+        """Take back a denied hit"""
+        try:
+            self.cache.decr(f'{key}:{window}', cost)
+        except ValueError:
+            pass
+
+class LocalBackend:
+    """In-process window counters, a stand-in for tests and single-process setups"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, cost, timeout):
+        with self._lock:
+            stale = [item for item in self._counts if item[0] == key and item[1] < window - 1]
+            for item in stale:
+                del self._counts[item]
+            current = self._counts.get((key, window), 0) + cost
+            self._counts[(key, window)] = current
+            return self._counts.get((key, window - 1), 0), current
+
+    def undo(self, key, window, cost):
+        with self._lock:
+            if (key, window) in self._counts:
+                self._counts[(key, window)] -= cost
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+def get_backend():
+    """The RATE_LIMIT_BACKEND instance, one per process"""
+    path = getattr(settings, 'RATE_LIMIT_BACKEND', 'apps.common.ratelimit.CacheBackend')
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+def hit(key, rate, cost=1, now=None):
+    """
+    Charge cost against key under rate; returns (allowed, retry_after).
+
+    Sliding window counter: the count of the current fixed window plus
+    the previous window's count weighted by how much of it still overlaps
+    the sliding window. Approximates a sliding log with two counters per
+    key, and lets the window slide instead of resetting on every request.
+    A denied hit is taken back, so clients are not locked out by retries.
+    """
+    limit, period = parse_rate(rate)
+    window, offset = divmod(now if now is not None else time.time(), period)
+    window = int(window)
+    backend = get_backend()
+    previous, current = backend.hit(key, window, cost, period * 2)
+
+    used = previous * (1 - offset / period) + current
+    if used <= limit:
+        return True, None
+
+    backend.undo(key, window, cost)
+    if previous and current <= limit:
+        # The previous window's share drains at previous / period per second
+        retry_after = min((used - limit) * period / previous, period - offset)
+    else:
+        retry_after = period - offset
+    return False, retry_after
+
+def get_client_ip(request):
+    """Client IP address, None when it is not a valid address"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0].strip()
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+def get_request_cost(request, view=None):
+    """
+    Units a request charges: the view's rate_limit_cost, else the
+    RATE_LIMIT_COSTS entry of its URL name, else 1.
+    """
+    cost = getattr(view, 'rate_limit_cost', None)
+    if cost is not None:
+        return cost
+    match = getattr(request, 'resolver_match', None)
+    costs = getattr(settings, 'RATE_LIMIT_COSTS', {})
+    return costs.get(match.view_name, 1) if match is not None else 1
+
+def check_request(request, user=None, cost=1, scope=None):
+    """
+    Charge a request to its user, or to its IP when anonymous.
+
+    Rates come from DEFAULT_THROTTLE_RATES: scope when given, else
+    'authenticated_user' or 'anonymous_user'. Returns (allowed, retry_after).
+    """
+    rates = api_settings.DEFAULT_THROTTLE_RATES
+    if user is not None and user.is_authenticated:
+        ident = f'user:{user.pk}'
+        scope = scope or 'authenticated_user'
+    else:
+        ident = f'ip:{get_client_ip(request)}'
+        scope = scope or 'anonymous_user'
+    rate = rates.get(scope)
+    if rate is None:
+        return True, None
+    return hit(f'ratelimit:{scope}:{ident}', rate, cost)
@@ -0,0 +1,141 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+# Seconds a cached response is served as fresh
+FRESH_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+# Further seconds a stale response may be served while one request rebuilds it
+STALE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_STALE_TIMEOUT', 300)
+
+# Upper bound on one rebuild; other requests serve stale or wait meanwhile
+LOCK_TIMEOUT = 10
+
+# How long a cold miss waits for a rebuild already in progress
+MISS_WAIT = 2.0
+MISS_POLL = 0.05
+
+def tag_key(tag):
+    return f'response:tag:{tag}'
+
+def get_tag_versions(tags):
+    """Current version of each tag; a missing version is started from the clock"""
+    keys = {tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        if key not in found:
+            # Never restart at a small number: an entry stored before the
+            # version was evicted must not match the new one by chance
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+def invalidate_responses(*tags):
+    """Mark every cached response carrying one of tags as stale"""
+    for tag in tags:
+        try:
+            cache.incr(tag_key(tag))
+        except ValueError:
+            # No version yet, so no entry can hold one
+            pass
+
+class CachedResponseMixin:
+    """
+    Shared cache for anonymous GET responses of a DRF view.
+
+    Entries are keyed on the absolute path, sorted query parameters, active
+    language and renderer format, and remember the version of each of their
+    tags (see get_cache_tags); invalidate_responses(tag) makes them stale.
+    A stale entry keeps being served for STALE_TIMEOUT seconds while a
+    single request rebuilds it, and a cold miss waits briefly for a rebuild
+    already in progress, so invalidating a hot page does not stampede the
+    database. Set RESPONSE_CACHE_STALE_WHILE_REVALIDATE = False to always
+    rebuild stale entries inline.
+    """
+    cache_tags = ()
+
+    def get_cache_tags(self, data):
+        """Tags of a freshly built response; extend for data-dependent tags"""
+        return list(self.cache_tags)
+
+    def cached_response_hit(self, request, data):
+        """Called when data is served from the cache, e.g. to record a view"""
+
+    def should_cache_response(self, request):
+        return (
+            getattr(settings, 'RESPONSE_CACHE_ENABLED', True) and
+            request.method == 'GET' and
+            not request.user.is_authenticated
+        )
+
+    def get_cache_key(self, request):
+        query = urlencode(sorted((key, request.GET.getlist(key)) for key in request.GET), doseq=True)
+        parts = [
+            request.build_absolute_uri(request.path), query,
+            get_language() or '', request.accepted_renderer.format
+        ]
+        return 'response:' + hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        if not self.should_cache_response(request):
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        lock_key = f'{key}:lock'
+        entry = cache.get(key)
+        if entry is not None and self.is_fresh(entry):
+            return self.respond_from_cache(request, entry)
+
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        if not locked:
+            # Another request is rebuilding: serve what it replaces, or on a
+            # cold miss wait briefly for its result
+            if entry is None:
+                entry = self.wait_for_entry(key)
+            serve_stale = getattr(settings, 'RESPONSE_CACHE_STALE_WHILE_REVALIDATE', True)
+            if entry is not None and (serve_stale or self.is_fresh(entry)):
+                return self.respond_from_cache(request, entry)
+
+        try:
+            # Versions are read before building, so a change made meanwhile
+            # leaves the new entry stale rather than hiding the change
+            versions = get_tag_versions(self.cache_tags)
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == 200:
+                tags = set(self.get_cache_tags(response.data)) - set(versions)
+                versions.update(get_tag_versions(tags))
+                cache.set(key, {
+                    'data': response.data,
+                    'status': response.status_code,
+                    'versions': versions,
+                    'fresh_until': time.time() + FRESH_TIMEOUT,
+                }, FRESH_TIMEOUT + STALE_TIMEOUT)
+            return response
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+    def is_fresh(self, entry):
+        return (
+            entry['fresh_until'] > time.time() and
+            get_tag_versions(entry['versions']) == entry['versions']
+        )
+
+    def wait_for_entry(self, key):
+        deadline = time.monotonic() + MISS_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(MISS_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def respond_from_cache(self, request, entry):
+        self.cached_response_hit(request, entry['data'])
+        return Response(entry['data'], status=entry['status'])
@@ -1,21 +1,30 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from rest_framework.throttling import BaseThrottle
+from .ratelimit import check_request, get_request_cost
 
-class AuthenticatedUserThrottle(UserRateThrottle):
-    """Rate limiting for authenticated users"""
-    scope = 'authenticated_user'
-    rate = '1000/hour'
+class RateLimitThrottle(BaseThrottle):
+    """
+    Sliding-window rate limit for authenticated users and anonymous IPs.
 
-class AnonymousUserThrottle(AnonRateThrottle):
-    """Rate limiting for anonymous users"""
-    scope = 'anonymous_user'
-    rate = '100/hour'
+    The single default throttle: it runs after authentication, so JWT users
+    are charged to their account, and RateLimitMiddleware leaves DRF views to
+    it, so each request costs one limiter check. Requests are weighted by
+    get_request_cost.
+    """
+    scope = None
+    
+    def allow_request(self, request, view):
+        allowed, self.retry_after = check_request(
+            request, request.user, get_request_cost(request, view), self.scope
+        )
+        return allowed
+    
+    def wait(self):
+        return self.retry_after
 
-class LoginThrottle(AnonRateThrottle):
+class LoginThrottle(RateLimitThrottle):
     """Special rate limiting for login attempts"""
     scope = 'login'
-    rate = '10/hour'
 
-class RegistrationThrottle(AnonRateThrottle):
+class RegistrationThrottle(RateLimitThrottle):
     """Rate limiting for registration attempts"""
     scope = 'registration'
-    rate = '5/hour'
@@ -1,7 +1,14 @@
 import re
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+# Slug allocations tried when concurrent inserts keep taking the slug first
+SLUG_ATTEMPTS = 3
+
 def validate_phone_number(phone_number):
     """Validate phone number format"""
     pattern = r'^\+\d{1,15}$'
@@ -9,16 +16,68 @@ def validate_phone_number(phone_number):
         raise ValidationError(_('Phone number must be in format +1234567890'))
     return phone_number
 
-def generate_unique_slug(model_class, title, slug_field='slug'):
-    """Generate unique slug for model"""
-    from django.utils.text import slugify
+def allocate_unique_slugs(model_class, values, slug_field='slug'):
+    """
+    Unique slugs for many values from one query, whatever their number of
+    namesakes.
     
-    base_slug = slugify(title)
-    slug = base_slug
-    counter = 1
+    For each distinct slugified value the query returns only whether the
+    bare slug is taken and the highest numeric N among its 'slug-N'
+    siblings, read from an index range; each value then gets the bare slug
+    if free, else the next suffix after the highest. Slugs handed out
+    earlier in the batch are never repeated.
+    """
+    bases = [slugify(value) for value in values]
+    distinct = list(dict.fromkeys(bases))
+    condition = Q()
+    aggregates = {}
+    for index, base in enumerate(distinct):
+        # '.' sorts right after '-', so the range holds every slug starting with 'base-'
+        suffixed = Q(**{
+            f'{slug_field}__gte': f'{base}-',
+            f'{slug_field}__lt': f'{base}.',
+            f'{slug_field}__regex': rf'^{re.escape(base)}-[0-9]{{1,18}}$',
+        })
+        condition |= Q(**{slug_field: base}) | suffixed
+        aggregates[f'taken_{index}'] = Count('pk', filter=Q(**{slug_field: base}))
+        aggregates[f'last_{index}'] = Max(
+            Cast(Substr(slug_field, len(base) + 2), BigIntegerField()), filter=suffixed
+        )
+    found = model_class._default_manager.filter(condition).aggregate(**aggregates) if distinct else {}
     
-    while model_class.objects.filter(**{slug_field: slug}).exists():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
+    taken = {base for index, base in enumerate(distinct) if found[f'taken_{index}']}
+    last = {base: found[f'last_{index}'] or 0 for index, base in enumerate(distinct)}
+    allocated = set()
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken or slug in allocated:
+            last[base] += 1
+            slug = f'{base}-{last[base]}'
+        allocated.add(slug)
+        slugs.append(slug)
+    return slugs
+
+def generate_unique_slug(model_class, title, slug_field='slug'):
+    """Generate unique slug for model with one query"""
+    return allocate_unique_slugs(model_class, [title], slug_field)[0]
+
+def save_with_unique_slug(instance, title, save, slug_field='slug'):
+    """
+    Give instance a unique slug from title and call save().
     
-    return slug
+    Two requests can allocate the same slug at once; the one losing the
+    unique constraint allocates again instead of failing, up to
+    SLUG_ATTEMPTS times. Other integrity errors are raised as they are.
+    """
+    model_class = type(instance)
+    for attempt in range(SLUG_ATTEMPTS):
+        slug = generate_unique_slug(model_class, title, slug_field)
+        setattr(instance, slug_field, slug)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            lost_slug = model_class._default_manager.filter(**{slug_field: slug}).exists()
+            if attempt == SLUG_ATTEMPTS - 1 or not lost_slug:
+                raise
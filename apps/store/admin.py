@@ -4,7 +4,11 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.db.models import Count
 from django.contrib.admin import SimpleListFilter
-from .models import Category, Ad, AdPhoto, AdLike, AdView
+from apps.common.response_cache import invalidate_responses
+from .autocomplete import autocomplete_index
+from .category_tree import invalidate_category_tree
+from .models import Category, Ad, AdPhoto, AdLike, AdView, AdViewDaily, PopularSearch, TrendingAd
+from .popular import invalidate_top
 
 try:
     from modeltranslation.admin import TabbedTranslationAdmin
@@ -99,13 +103,24 @@ class CategoryAdmin(TabbedTranslationAdmin if TRANSLATION_AVAILABLE else admin.M
     actions = ['activate_categories', 'deactivate_categories']
 
     def activate_categories(self, request, queryset):
+        category_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=True)
+        # update() skips the post_save signals that drop cached trees
+        invalidate_category_tree()
+        autocomplete_index.refresh('category', category_ids)
+        invalidate_top()
+        invalidate_responses('categories')
         self.message_user(request, f'{updated} categories activated.')
 
     activate_categories.short_description = _('Activate selected categories')
 
     def deactivate_categories(self, request, queryset):
+        category_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=False)
+        invalidate_category_tree()
+        autocomplete_index.refresh('category', category_ids)
+        invalidate_top()
+        invalidate_responses('categories')
         self.message_user(request, f'{updated} categories deactivated.')
 
     deactivate_categories.short_description = _('Deactivate selected categories')
@@ -227,26 +242,40 @@ class AdAdmin(TabbedTranslationAdmin if TRANSLATION_AVAILABLE else admin.ModelAd
 
     actions = ['activate_ads', 'deactivate_ads', 'feature_ads', 'unfeature_ads']
 
+    def invalidate_responses(self, ad_ids):
+        # update() skips the post_save signals that drop cached responses
+        invalidate_responses('ads', *(f'ad:{ad_id}' for ad_id in ad_ids))
+
     def activate_ads(self, request, queryset):
+        ad_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=True)
+        self.invalidate_responses(ad_ids)
+        autocomplete_index.refresh('product', ad_ids)
         self.message_user(request, f'{updated} ads activated.')
 
     activate_ads.short_description = _('Activate selected ads')
 
     def deactivate_ads(self, request, queryset):
+        ad_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=False)
+        self.invalidate_responses(ad_ids)
+        autocomplete_index.refresh('product', ad_ids)
         self.message_user(request, f'{updated} ads deactivated.')
 
     deactivate_ads.short_description = _('Deactivate selected ads')
 
     def feature_ads(self, request, queryset):
+        ad_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_featured=True)
+        self.invalidate_responses(ad_ids)
         self.message_user(request, f'{updated} ads featured.')
 
     feature_ads.short_description = _('Feature selected ads')
 
     def unfeature_ads(self, request, queryset):
+        ad_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_featured=False)
+        self.invalidate_responses(ad_ids)
         self.message_user(request, f'{updated} ads unfeatured.')
 
     unfeature_ads.short_description = _('Unfeature selected ads')
@@ -293,3 +322,30 @@ class AdViewAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('ad', 'user')
+
+
+@admin.register(PopularSearch)
+class PopularSearchAdmin(admin.ModelAdmin):
+    list_display = ['category', 'search_count', 'updated_at']
+    list_select_related = ['category']
+    raw_id_fields = ['category']
+    readonly_fields = ['search_count', 'created_at', 'updated_at']
+
+
+@admin.register(AdViewDaily)
+class AdViewDailyAdmin(admin.ModelAdmin):
+    list_display = ['ad', 'day', 'views', 'unique_visitors']
+    list_filter = ['day']
+    list_select_related = ['ad']
+    raw_id_fields = ['ad']
+    date_hierarchy = 'day'
+    readonly_fields = ['views', 'unique_visitors', 'last_view_id', 'created_at', 'updated_at']
+
+
+@admin.register(TrendingAd)
+class TrendingAdAdmin(admin.ModelAdmin):
+    list_display = ['rank', 'ad', 'category', 'score', 'updated_at']
+    list_filter = [('category', admin.EmptyFieldListFilter)]
+    list_select_related = ['ad', 'category']
+    raw_id_fields = ['ad', 'category']
+    readonly_fields = ['rank', 'score', 'created_at', 'updated_at']
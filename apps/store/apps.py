@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+def ensure_search_index(sender, using, **kwargs):
+    """Re-create full-text triggers dropped by SQLite table remakes"""
+    from django.db import connections
+    from .search import install_search_index
+    install_search_index(connections[using])
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.store'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(ensure_search_index, sender=self)
@@ -0,0 +1,287 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import translation
+from django.utils.translation import get_language
+
+logger = logging.getLogger(__name__)
+
+# Full rebuild interval, picks up writes made by other worker processes
+REBUILD_INTERVAL = getattr(settings, 'STORE_AUTOCOMPLETE_REBUILD_INTERVAL', 600)
+
+# Ranked results kept per typed prefix between index mutations
+MAX_CACHED_PREFIXES = 2048
+
+def normalize(text):
+    """Lowercase text and collapse it to space-separated word tokens"""
+    return ' '.join(re.findall(r'\w+', (text or '').casefold()))
+
+def get_terms(text):
+    """Index terms of a name: the name from each word start onwards"""
+    words = normalize(text).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+class Suggestion:
+    __slots__ = ('kind', 'id', 'name_uz', 'name_ru', 'icon', 'score', 'terms')
+
+    def __init__(self, kind, id, name_uz, name_ru, icon, score):
+        self.kind = kind
+        self.id = id
+        self.name_uz = name_uz
+        self.name_ru = name_ru
+        self.icon = icon or None
+        self.score = score or 0
+        self.terms = get_terms(name_uz) | get_terms(name_ru)
+
+    def as_dict(self, language):
+        return {
+            'id': self.id,
+            'name': self.name_ru if language == 'ru' else self.name_uz,
+            'icon': self.icon,
+            'type': self.kind,
+        }
+
+class AutocompleteIndex:
+    """
+    Per-process prefix index over active ad and category names.
+
+    Terms are kept in one sorted list of (term, kind, id) keys, so a prefix
+    lookup is a bisect plus a scan of the matching range, and category terms
+    again in a list of their own for category-only lookups; ranked matches are
+    memoized per prefix until the next change to the term set. Ads rank by
+    view_count, categories by the views of their active ads.
+
+    The first use loads the index; after that lookups never wait on the
+    database. Every REBUILD_INTERVAL a background thread reloads it while
+    the current one keeps serving, and updates that arrive during a load
+    are replayed onto the new index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Drop the index; it is rebuilt lazily on next use"""
+        with self._lock:
+            self._entries = {}
+            self._keys = []
+            self._category_keys = []
+            self._cache = {}
+            self._built_at = None
+            self._pending = None
+
+    def build(self):
+        """Load every active ad and category into a fresh index"""
+        with self._build_lock:
+            self._build()
+
+    def _build(self):
+        with self._lock:
+            # Logged from here on, the rows read below may predate them
+            self._pending = []
+        try:
+            entries = self._load()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        keys = sorted(
+            (term, kind, pk)
+            for (kind, pk), suggestion in entries.items()
+            for term in suggestion.terms
+        )
+        category_keys = [(term, pk) for term, kind, pk in keys if kind == 'category']
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._category_keys = category_keys
+            self._cache = {}
+            pending, self._pending = self._pending, None
+            for apply, args in pending:
+                apply(*args)
+            self._built_at = time.monotonic()
+
+    def _load(self, kind=None, pks=None):
+        """Suggestions of every active ad and category, or only of kind with ids in pks"""
+        from .models import Ad, Category
+
+        categories = Category.objects.filter(is_active=True)
+        ads = Ad.objects.filter(is_active=True)
+        if kind is not None:
+            categories = categories.filter(pk__in=pks) if kind == 'category' else categories.none()
+            ads = ads.filter(pk__in=pks) if kind == 'product' else ads.none()
+
+        entries = {}
+        with translation.override(settings.LANGUAGE_CODE):
+            categories = categories.annotate(
+                popularity=Coalesce(Sum('ads__view_count', filter=Q(ads__is_active=True)), 0)
+            ).values_list('id', 'name_uz', 'name_ru', 'icon', 'popularity')
+            for pk, name_uz, name_ru, icon, popularity in categories:
+                entries[('category', pk)] = Suggestion(
+                    'category', pk, name_uz, name_ru, icon, popularity
+                )
+
+            ads = ads.values_list(
+                'id', 'name_uz', 'name_ru', 'category__icon', 'view_count'
+            )
+            for pk, name_uz, name_ru, icon, view_count in ads:
+                entries[('product', pk)] = Suggestion(
+                    'product', pk, name_uz, name_ru, icon, view_count
+                )
+        return entries
+
+    def ensure_built(self):
+        built_at = self._built_at
+        if built_at is None:
+            # Nothing to serve yet: one caller loads, the others wait for it
+            with self._build_lock:
+                if self._built_at is None:
+                    self._build()
+        elif time.monotonic() - built_at > REBUILD_INTERVAL and self._build_lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild, daemon=True, name='autocomplete rebuild').start()
+
+    def _rebuild(self):
+        try:
+            self._build()
+        except Exception:
+            logger.exception('Failed to rebuild the autocomplete index')
+        finally:
+            self._build_lock.release()
+            close_old_connections()
+
+    def complete(self, text, limit=10, offset=0, language=None):
+        """Return (count, suggestions) for names starting with text"""
+        prefix = normalize(text)
+        if not prefix:
+            return 0, []
+        self.ensure_built()
+
+        ranked = self._cache.get(prefix)
+        if ranked is None:
+            ranked = self._rank(prefix)
+
+        language = language or get_language()
+        entries = self._entries
+        window = ranked[offset:offset + limit]
+        return len(ranked), [entries[key].as_dict(language) for key in window if key in entries]
+
+    def _rank(self, prefix):
+        matches = set()
+        # Under the lock, update() and remove() shift the list in place
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and keys[position][0].startswith(prefix):
+                matches.add(keys[position][1:])
+                position += 1
+
+        entries = self._entries
+        ranked = sorted(
+            (key for key in matches if key in entries),
+            key=lambda key: (-entries[key].score, key)
+        )
+        with self._lock:
+            if len(self._cache) >= MAX_CACHED_PREFIXES:
+                self._cache = {}
+            self._cache[prefix] = ranked
+        return ranked
+
+    def match_categories(self, words):
+        """Active categories whose names have a word starting with each of words"""
+        self.ensure_built()
+        matched = None
+        for word in words:
+            # Terms start at each word of a name, so the prefix range holds its word matches
+            pks = set()
+            with self._lock:
+                keys = self._category_keys
+                position = bisect_left(keys, (word,))
+                while position < len(keys) and keys[position][0].startswith(word):
+                    pks.add(keys[position][1])
+                    position += 1
+            matched = pks if matched is None else matched & pks
+            if not matched:
+                return []
+
+        entries = self._entries
+        matches = [entries[('category', pk)] for pk in matched if ('category', pk) in entries]
+        matches.sort(key=lambda suggestion: (-suggestion.score, suggestion.id))
+        return matches
+
+    def get_icon(self, kind, pk):
+        entry = self._entries.get((kind, pk))
+        return entry.icon if entry is not None else None
+
+    def update(self, kind, pk, name_uz, name_ru, icon, score=None):
+        """Insert or refresh one suggestion; score None keeps the current one"""
+        self._apply(self._update, kind, pk, name_uz, name_ru, icon, score)
+
+    def remove(self, kind, pk):
+        """Drop one suggestion, e.g. a deactivated ad"""
+        self._apply(self._remove, kind, pk)
+
+    def refresh(self, kind, pks):
+        """Re-read suggestions of kind for pks, after changes that sent no post_save"""
+        if self._built_at is None and self._pending is None:
+            return
+        loaded = self._load(kind, pks)
+        for pk in pks:
+            suggestion = loaded.get((kind, pk))
+            if suggestion is None:
+                self.remove(kind, pk)
+            else:
+                self.update(
+                    kind, pk, suggestion.name_uz, suggestion.name_ru, suggestion.icon, suggestion.score
+                )
+
+    def _apply(self, apply, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((apply, args))
+            if self._built_at is not None:
+                apply(*args)
+
+    def _update(self, kind, pk, name_uz, name_ru, icon, score):
+        previous = self._entries.get((kind, pk))
+        if score is None:
+            score = previous.score if previous is not None else 0
+        suggestion = Suggestion(kind, pk, name_uz, name_ru, icon, score)
+        self._entries[(kind, pk)] = suggestion
+        if previous is not None and previous.terms == suggestion.terms:
+            # Only the popularity moved; cached orderings catch up on rebuild
+            return
+        if previous is not None:
+            self._remove_keys(kind, pk, previous.terms)
+        for term in suggestion.terms:
+            insort(self._keys, (term, kind, pk))
+            if kind == 'category':
+                insort(self._category_keys, (term, pk))
+        self._cache = {}
+
+    def _remove(self, kind, pk):
+        previous = self._entries.pop((kind, pk), None)
+        if previous is None:
+            return
+        self._remove_keys(kind, pk, previous.terms)
+        self._cache = {}
+
+    def _remove_keys(self, kind, pk, terms):
+        for term in terms:
+            position = bisect_left(self._keys, (term, kind, pk))
+            if position < len(self._keys) and self._keys[position] == (term, kind, pk):
+                del self._keys[position]
+            if kind == 'category':
+                position = bisect_left(self._category_keys, (term, pk))
+                if position < len(self._category_keys) and self._category_keys[position] == (term, pk):
+                    del self._category_keys[position]
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,116 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.utils import translation
+from django.utils.translation import get_language
+
+# The version only reaches the processes sharing the cache, so this bounds
+# how long other workers may serve a changed tree
+CACHE_TIMEOUT = getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', 60)
+
+VERSION_KEY = 'store:category_tree:version'
+
+# Per-process copy of the node map, skips unpickling it on every lookup
+_local_nodes = {}
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Started from the clock so an evicted version never matches a local copy
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+def invalidate_category_tree():
+    """Drop every cached tree and node map; call after any category change"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+def load_nodes():
+    """All categories as {id: node} from a single query, cached per version"""
+    from .models import Category
+
+    version = get_version()
+    entry = _local_nodes.get(version)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    key = f'store:category_nodes:{version}'
+    nodes = cache.get(key)
+    if nodes is None:
+        with translation.override(settings.LANGUAGE_CODE):
+            rows = list(Category.objects.order_by('order', 'name_uz').values_list(
+                'id', 'parent_id', 'name_uz', 'name_ru', 'slug', 'icon', 'is_active'
+            ))
+        nodes = {
+            pk: {
+                'id': pk,
+                'parent': parent_id,
+                'name_uz': name_uz,
+                'name_ru': name_ru,
+                'slug': slug,
+                'icon': icon or None,
+                'is_active': is_active,
+            }
+            for pk, parent_id, name_uz, name_ru, slug, icon, is_active in rows
+        }
+        cache.set(key, nodes, CACHE_TIMEOUT)
+    _local_nodes.clear()
+    _local_nodes[version] = (nodes, time.monotonic() + CACHE_TIMEOUT)
+    return nodes
+
+def get_category_tree(request=None, language=None):
+    """
+    Active root categories with nested active children, serialized.
+
+    Matches CategoryWithChildsSerializer output and is cached per language
+    and host (icon URLs are absolute when a request is given).
+    """
+    language = language or get_language()
+    base_url = request.build_absolute_uri('/') if request is not None else ''
+    key = f'store:category_tree:{get_version()}:{language}:{base_url}'
+    tree = cache.get(key)
+    if tree is not None:
+        return tree
+
+    nodes = load_nodes()
+    children = {}
+    for node in nodes.values():
+        if node['is_active']:
+            children.setdefault(node['parent'], []).append(node)
+
+    def serialize(node):
+        icon = node['icon']
+        if icon:
+            icon = default_storage.url(icon)
+            if request is not None:
+                icon = request.build_absolute_uri(icon)
+        return {
+            'id': node['id'],
+            'name': node['name_ru'] if language == 'ru' else node['name_uz'],
+            'slug': node['slug'],
+            'icon': icon,
+            'children': [serialize(child) for child in children.get(node['id'], [])],
+        }
+
+    tree = [serialize(node) for node in children.get(None, [])]
+    cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
+
+def get_breadcrumbs(category_id, language=None):
+    """Path from the root category down to category_id, without queries once cached"""
+    language = language or get_language()
+    nodes = load_nodes()
+    path = []
+    node = nodes.get(category_id)
+    while node is not None and len(path) < len(nodes):
+        path.append({
+            'id': node['id'],
+            'name': node['name_ru'] if language == 'ru' else node['name_uz'],
+            'slug': node['slug'],
+        })
+        node = nodes.get(node['parent'])
+    return path[::-1]
@@ -0,0 +1,36 @@
+from apps.common.exports import CHUNK_SIZE, chunked
+
+AD_EXPORT_COLUMNS = [
+    'id', 'slug', 'name_uz', 'name_ru', 'price', 'is_active', 'is_featured',
+    'view_count', 'published_at', 'category_id', 'category_slug',
+    'seller_id', 'seller_phone_number', 'seller_full_name', 'photos',
+]
+
+def iter_ad_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Export rows for an Ad queryset, in id order.
+
+    Ads stream through QuerySet.iterator(); photo URLs are read with one
+    query per chunk of ads.
+    """
+    from .models import AdPhoto
+
+    storage = AdPhoto._meta.get_field('image').storage
+    rows = queryset.order_by('id').values(
+        'id', 'slug', 'name_uz', 'name_ru', 'price', 'is_active', 'is_featured',
+        'view_count', 'published_at', 'category_id', 'category__slug',
+        'seller_id', 'seller__phone_number', 'seller__full_name',
+    )
+    for chunk in chunked(rows.iterator(chunk_size=chunk_size), chunk_size):
+        photos = {}
+        for ad_id, image in AdPhoto.objects.filter(ad_id__in=[row['id'] for row in chunk]).order_by(
+            'ad_id', 'order', 'id'
+        ).values_list('ad_id', 'image'):
+            photos.setdefault(ad_id, []).append(storage.url(image))
+
+        for row in chunk:
+            row['category_slug'] = row.pop('category__slug')
+            row['seller_phone_number'] = row.pop('seller__phone_number')
+            row['seller_full_name'] = row.pop('seller__full_name')
+            row['photos'] = photos.get(row['id'], [])
+            yield row
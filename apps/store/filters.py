@@ -1,9 +1,37 @@
 import django_filters
+from django.db.models import Q
+from rest_framework.filters import OrderingFilter, SearchFilter
 from .models import Ad, Category
+from .search import is_supported, search_ads
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+def filter_category_subtrees(queryset, paths):
+    """
+    Restrict ads to the given categories and all their subcategories.
+    
+    Each subtree is one range over the indexed category path, so a root
+    category costs the same as a leaf; paths nested in another are dropped.
+    """
+    roots = []
+    for path in sorted(set(paths)):
+        if not roots or not path.startswith(roots[-1]):
+            roots.append(path)
+    if not roots:
+        return queryset.none()
+    
+    condition = Q()
+    for path in roots:
+        condition |= Q(**Category.subtree_lookup(path, prefix='category__', include_self=True))
+    return queryset.filter(condition)
 
 class AdFilter(django_filters.FilterSet):
     """Filter for advertisements"""
-    category = django_filters.ModelChoiceFilter(queryset=Category.objects.all())
+    category = django_filters.ModelChoiceFilter(
+        queryset=Category.objects.all(), method='filter_category'
+    )
+    category_ids = NumberInFilter(method='filter_category_ids')
     min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
     seller = django_filters.NumberFilter(field_name='seller__id')
@@ -14,3 +42,35 @@ class AdFilter(django_filters.FilterSet):
     class Meta:
         model = Ad
         fields = ['category', 'seller', 'is_featured']
+    
+    def filter_category(self, queryset, name, value):
+        if not value:
+            return queryset
+        return filter_category_subtrees(queryset, [value.path])
+    
+    def filter_category_ids(self, queryset, name, value):
+        if not value:
+            return queryset
+        paths = Category.objects.filter(id__in=value).values_list('path', flat=True)
+        return filter_category_subtrees(queryset, paths)
+
+class AdSearchFilter(SearchFilter):
+    """
+    Full-text search over ad names and descriptions.
+
+    Uses the FTS5/tsvector index from apps.store.search and falls back to
+    the view's search_fields LIKE lookups on other database backends. Place
+    it after OrderingFilter: without an explicit ordering results are sorted
+    by relevance.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        if not is_supported():
+            return super().filter_queryset(request, queryset, view)
+        
+        text = request.query_params.get(self.search_param, '')
+        queryset = search_ads(queryset, text)
+        ranked = 'search_rank' in queryset.query.annotations
+        if ranked and OrderingFilter.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-search_rank', '-published_at')
+        return queryset
@@ -0,0 +1,60 @@
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import translation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from apps.store.models import Ad
+from apps.store.serializers import (
+    AdListSerializer, list_photos_prefetch, project_ad_list, serialize_ad_rows
+)
+
+class Command(BaseCommand):
+    help = 'Compare AdListSerializer with the projection path on a page of active ads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Ads rendered per run')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs of each path')
+        parser.add_argument('--language', default='uz', help='Language to render in')
+
+    def handle(self, *args, **options):
+        page_size, runs = options['page_size'], options['runs']
+        request = Request(RequestFactory().get('/api/v1/store/list/ads/'))
+        queryset = Ad.objects.filter(is_active=True).select_related(
+            'category', 'seller', 'seller__address'
+        ).order_by('-published_at', '-id')
+
+        def serializer_path():
+            page = list(queryset.prefetch_related(list_photos_prefetch())[:page_size])
+            data = AdListSerializer(page, many=True, context={'request': request}).data
+            return JSONRenderer().render(data)
+
+        def projection_path():
+            page = project_ad_list(queryset)[:page_size]
+            return JSONRenderer().render(serialize_ad_rows(page, request))
+
+        with translation.override(options['language']):
+            if serializer_path() != projection_path():
+                raise CommandError('Projection output differs from AdListSerializer')
+            for label, render in (('serializer', serializer_path), ('projection', projection_path)):
+                self.report(label, render, runs)
+
+    def report(self, label, render, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        tracemalloc.start()
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'{label:<12} median {timings[len(timings) // 2] * 1000:8.2f} ms  '
+            f'p95 {timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000:8.2f} ms  '
+            f'peak {peak / 1024:8.1f} KiB'
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from apps.common.exports import CHUNK_SIZE, EXPORT_FORMATS, write_export
+from apps.store.exports import AD_EXPORT_COLUMNS, iter_ad_rows
+from apps.store.filters import AdFilter
+from apps.store.models import Ad
+
+class Command(BaseCommand):
+    help = 'Stream advertisements to a CSV or NDJSON file, filtered like the ad list API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='Output format')
+        parser.add_argument('--output', help='File to write; standard output when omitted')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per database round trip')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='NAME=VALUE',
+            help='AdFilter parameter, e.g. category=5 or min_price=100; repeatable'
+        )
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Expected NAME=VALUE, got {item!r}')
+            params.appendlist(name, value)
+
+        filterset = AdFilter(params, queryset=Ad.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        rows = iter_ad_rows(filterset.qs, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                count = write_export(rows, AD_EXPORT_COLUMNS, options['format'], stream)
+            self.stderr.write(self.style.SUCCESS(f'Exported {count} ads to {options["output"]}'))
+        else:
+            write_export(rows, AD_EXPORT_COLUMNS, options['format'], self.stdout)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.store.rollup import BATCH_SIZE, RETENTION_DAYS, prune_views, rollup_views
+
+class Command(BaseCommand):
+    help = 'Roll new ad views up into daily totals and delete expired raw views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows read or deleted per statement')
+        parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS, help='Days raw views are kept')
+        parser.add_argument('--no-prune', action='store_true', help='Only roll up, keep raw views')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        processed = rollup_views(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {processed} ad views'))
+
+        if not options['no_prune']:
+            deleted = prune_views(days=options['retention_days'], batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired ad views'))
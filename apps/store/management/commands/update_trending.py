@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.store.rollup import rollup_views
+from apps.store.trending import update_trending
+
+class Command(BaseCommand):
+    help = 'Recompute trending ad rankings, globally and per category'
+
+    def handle(self, *args, **options):
+        # Fold in the latest views first so the ranking sees them
+        rollup_views()
+        rows = update_trending()
+        self.stdout.write(self.style.SUCCESS(f'Stored {rows} trending ranks'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['published_at', 'id'], name='store_ad_published_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['price', 'id'], name='store_ad_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['view_count', 'id'], name='store_ad_views_id_idx'),
+        ),
+    ]
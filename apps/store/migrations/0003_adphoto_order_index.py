@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adphoto',
+            index=models.Index(fields=['ad', 'order', 'id'], name='store_adphoto_ad_order_idx'),
+        ),
+    ]
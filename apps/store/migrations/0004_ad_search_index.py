@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from apps.store.search import install_search_index
+    install_search_index(schema_editor.connection, rebuild=True)
+
+
+def drop_search_index(apps, schema_editor):
+    from apps.store.search import remove_search_index
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_adphoto_order_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_ad_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('search_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Search Count')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='popular_search', to='store.category', verbose_name='Category')),
+            ],
+            options={
+                'verbose_name': 'Popular Search',
+                'verbose_name_plural': 'Popular Searches',
+                'ordering': ['-search_count'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('store', 'Category')
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def get_path(pk, seen=()):
+        if pk not in paths:
+            parent_id = parents.get(pk)
+            if parent_id is None or parent_id in seen:
+                prefix = '/'
+            else:
+                prefix = get_path(parent_id, seen + (pk,))
+            paths[pk] = f'{prefix}{pk}/'
+        return paths[pk]
+
+    categories = []
+    for pk in parents:
+        categories.append(Category(pk=pk, path=get_path(pk)))
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_popularsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='Path'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
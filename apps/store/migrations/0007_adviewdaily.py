@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_category_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+                ('unique_visitors', models.PositiveIntegerField(default=0, verbose_name='Unique Visitors')),
+                ('last_view_id', models.BigIntegerField(db_index=True, default=0, verbose_name='Last View ID')),
+            ],
+            options={
+                'verbose_name': 'Ad Daily Views',
+                'verbose_name_plural': 'Ad Daily Views',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='adview',
+            index=models.Index(fields=['ad', 'created_at'], name='store_adview_ad_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adview',
+            index=models.Index(fields=['created_at'], name='store_adview_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='adviewdaily',
+            name='ad',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='store.ad', verbose_name='Advertisement'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='adviewdaily',
+            unique_together={('ad', 'day')},
+        ),
+    ]
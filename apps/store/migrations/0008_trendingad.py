@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_adviewdaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingAd',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rank')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_ranks', to='store.ad', verbose_name='Advertisement')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending_ads', to='store.category', verbose_name='Category')),
+            ],
+            options={
+                'verbose_name': 'Trending Ad',
+                'verbose_name_plural': 'Trending Ads',
+                'ordering': ['category', 'rank'],
+                'indexes': [models.Index(fields=['category', 'rank'], name='store_trending_category_idx')],
+            },
+        ),
+    ]
@@ -1,13 +1,20 @@
+from functools import partial
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
+from apps.common.counters import BufferedCounter
 from apps.common.models import BaseModel
-from .utils import generate_unique_slug
+from .utils import save_with_unique_slug
 
 User = get_user_model()
 
 
+CYCLE_MESSAGE = _('A category cannot be moved under itself or its descendants')
+
 class Category(BaseModel):
     """Product categories with hierarchical structure"""
     name_uz = models.CharField(_('Name (Uzbek)'), max_length=255)
@@ -24,6 +31,8 @@ class Category(BaseModel):
     icon = models.ImageField(_('Icon'), upload_to='categories/', null=True, blank=True)
     is_active = models.BooleanField(_('Is Active'), default=True)
     order = models.PositiveIntegerField(_('Order'), default=0)
+    # Materialized path of ancestor ids including this one, e.g. "/1/5/12/"
+    path = models.CharField(_('Path'), max_length=255, db_index=True, editable=False, default='')
     
     class Meta:
         verbose_name = _('Category')
@@ -33,10 +42,67 @@ class Category(BaseModel):
     def __str__(self):
         return self.name_uz
     
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).first()
+            if f'/{self.pk}/' in (parent_path or ''):
+                raise ValidationError({'parent': CYCLE_MESSAGE})
+    
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(Category, self.name_uz)
-        super().save(*args, **kwargs)
+        parent_path = self.get_parent_path()
+        # Also checked in clean(), this catches saves that skip validation
+        if self.pk and f'/{self.pk}/' in parent_path:
+            raise ValueError(CYCLE_MESSAGE)
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name_uz, partial(super().save, *args, **kwargs))
+        self.update_path(parent_path)
+    
+    def get_parent_path(self):
+        if not self.parent_id:
+            return '/'
+        # Read from the database, a cached parent may predate its own move
+        return Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+    
+    def update_path(self, parent_path):
+        """Store this category's path and move its subtree along with it"""
+        new_path = f'{parent_path}{self.pk}/'
+        if new_path == self.path:
+            return
+        
+        old_path = self.path
+        Category.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            # One UPDATE rewrites the prefix of every descendant
+            Category.objects.filter(**self.subtree_lookup(old_path)).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+            )
+        self.path = new_path
+    
+    @staticmethod
+    def subtree_lookup(path, prefix='', include_self=False):
+        """
+        Range lookup matching descendants of path.
+        
+        Paths only hold digits and '/', and '0' sorts right after '/', so
+        the range stays an indexable B-tree scan where LIKE 'x%' may not.
+        Pass prefix='category__' to filter a related model by subtree.
+        """
+        return {
+            f'{prefix}path__{"gte" if include_self else "gt"}': path,
+            f'{prefix}path__lt': path[:-1] + '0',
+        }
+    
+    def get_ancestor_ids(self):
+        return [int(pk) for pk in self.path.strip('/').split('/')[:-1] if pk]
+    
+    def get_ancestors(self):
+        """Ancestor categories from the root down, in one query"""
+        ancestor_ids = self.get_ancestor_ids()
+        ancestors = Category.objects.in_bulk(ancestor_ids)
+        return [ancestors[pk] for pk in ancestor_ids if pk in ancestors]
     
     @property
     def name(self):
@@ -49,10 +115,7 @@ class Category(BaseModel):
     
     def get_all_children(self):
         """Get all descendant categories"""
-        children = list(self.children.all())
-        for child in self.children.all():
-            children.extend(child.get_all_children())
-        return children
+        return list(Category.objects.filter(**self.subtree_lookup(self.path)).order_by('path'))
 
 class Ad(BaseModel):
     """Product advertisements"""
@@ -83,14 +146,21 @@ class Ad(BaseModel):
         verbose_name = _('Advertisement')
         verbose_name_plural = _('Advertisements')
         ordering = ['-published_at']
+        indexes = [
+            # Keyset pagination seeks on (ordering field, id)
+            models.Index(fields=['published_at', 'id'], name='store_ad_published_id_idx'),
+            models.Index(fields=['price', 'id'], name='store_ad_price_id_idx'),
+            models.Index(fields=['view_count', 'id'], name='store_ad_views_id_idx'),
+        ]
         
     def __str__(self):
         return self.name_uz
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = generate_unique_slug(Ad, self.name_uz)
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name_uz, partial(super().save, *args, **kwargs))
     
     @property
     def name(self):
@@ -111,9 +181,14 @@ class Ad(BaseModel):
         return self.description_uz
     
     def increment_view_count(self):
-        """Increment view count"""
+        """Increment view count; the database is updated by view_counter in batches"""
         self.view_count += 1
-        self.save(update_fields=['view_count'])
+        view_counter.incr(self.pk)
+
+# Detail views only buffer hits; view_count is written off the request thread.
+# The buffer is per process, so a killed worker loses up to one flush
+# interval of views, see WriteBehindBuffer
+view_counter = BufferedCounter('store.Ad', 'view_count', background=True)
 
 class AdPhoto(BaseModel):
     """Photos for advertisements"""
@@ -130,6 +205,9 @@ class AdPhoto(BaseModel):
         verbose_name = _('Ad Photo')
         verbose_name_plural = _('Ad Photos')
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['ad', 'order', 'id'], name='store_adphoto_ad_order_idx'),
+        ]
         
     def __str__(self):
         return f"{self.ad.name_uz} - Photo {self.order}"
@@ -178,6 +256,81 @@ class AdView(BaseModel):
     class Meta:
         verbose_name = _('Ad View')
         verbose_name_plural = _('Ad Views')
+        indexes = [
+            models.Index(fields=['ad', 'created_at'], name='store_adview_ad_created_idx'),
+            models.Index(fields=['created_at'], name='store_adview_created_idx'),
+        ]
         
     def __str__(self):
         return f"View of {self.ad.name_uz}"
+
+class AdViewDaily(BaseModel):
+    """Daily view totals per advertisement, rolled up from AdView"""
+    ad = models.ForeignKey(
+        Ad,
+        on_delete=models.CASCADE,
+        related_name='daily_views',
+        verbose_name=_('Advertisement')
+    )
+    day = models.DateField(_('Day'))
+    views = models.PositiveIntegerField(_('Views'), default=0)
+    unique_visitors = models.PositiveIntegerField(_('Unique Visitors'), default=0)
+    # Highest AdView id folded in when this row was last recomputed
+    last_view_id = models.BigIntegerField(_('Last View ID'), default=0, db_index=True)
+    
+    class Meta:
+        verbose_name = _('Ad Daily Views')
+        verbose_name_plural = _('Ad Daily Views')
+        ordering = ['-day']
+        unique_together = ['ad', 'day']
+        
+    def __str__(self):
+        return f"{self.ad.name_uz}: {self.day}"
+
+class PopularSearch(BaseModel):
+    """How often users searched within a category"""
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='popular_search',
+        verbose_name=_('Category')
+    )
+    search_count = models.PositiveIntegerField(_('Search Count'), default=0, db_index=True)
+    
+    class Meta:
+        verbose_name = _('Popular Search')
+        verbose_name_plural = _('Popular Searches')
+        ordering = ['-search_count']
+        
+    def __str__(self):
+        return f"{self.category.name_uz} - {self.search_count}"
+
+class TrendingAd(BaseModel):
+    """Precomputed trending rank of an ad, globally or within a category subtree"""
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='trending_ads',
+        verbose_name=_('Category')
+    )
+    ad = models.ForeignKey(
+        Ad,
+        on_delete=models.CASCADE,
+        related_name='trending_ranks',
+        verbose_name=_('Advertisement')
+    )
+    rank = models.PositiveSmallIntegerField(_('Rank'))
+    score = models.FloatField(_('Score'))
+    
+    class Meta:
+        verbose_name = _('Trending Ad')
+        verbose_name_plural = _('Trending Ads')
+        ordering = ['category', 'rank']
+        indexes = [
+            models.Index(fields=['category', 'rank'], name='store_trending_category_idx'),
+        ]
+        
+    def __str__(self):
+        return f"#{self.rank} {self.ad.name_uz}"
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from apps.common.counters import BufferedCounter
+
+# Number of categories kept in the populars snapshot
+TOP_SIZE = 50
+
+TOP_CACHE_KEY = 'store:popular_searches'
+
+# The snapshot is merged incrementally on every flush; this bounds how long
+# an update lost to two workers merging at once can linger
+TOP_CACHE_TIMEOUT = 60 * 60
+
+def to_entry(popular_search):
+    category = popular_search.category
+    return {
+        'id': popular_search.id,
+        'category': popular_search.category_id,
+        'name_uz': category.name_uz,
+        'name_ru': category.name_ru,
+        'icon': category.icon.name if category.icon else None,
+        'search_count': popular_search.search_count,
+    }
+
+def rebuild_top():
+    """Load the top categories from the database and cache them"""
+    from .models import PopularSearch
+
+    top = [
+        to_entry(popular_search)
+        for popular_search in PopularSearch.objects.select_related('category').filter(
+            category__is_active=True, search_count__gt=0
+        ).order_by('-search_count', 'id')[:TOP_SIZE]
+    ]
+    cache.set(TOP_CACHE_KEY, top, TOP_CACHE_TIMEOUT)
+    return top
+
+def get_top():
+    """Most searched categories, highest count first"""
+    top = cache.get(TOP_CACHE_KEY)
+    if top is None:
+        top = rebuild_top()
+    return top
+
+def invalidate_top():
+    cache.delete(TOP_CACHE_KEY)
+
+def merge_top(flushed):
+    """
+    Fold freshly flushed counts into the cached top list.
+
+    Counts only grow, so a category can only enter the top by being among
+    the rows just flushed: merging those into the current top K keeps the
+    snapshot exact with one query over the flushed rows.
+    """
+    from .models import PopularSearch
+
+    top = cache.get(TOP_CACHE_KEY)
+    if top is None:
+        rebuild_top()
+        return
+
+    entries = {entry['category']: entry for entry in top}
+    for popular_search in PopularSearch.objects.select_related('category').filter(
+        category_id__in=list(flushed), category__is_active=True
+    ):
+        entries[popular_search.category_id] = to_entry(popular_search)
+
+    top = sorted(entries.values(), key=lambda entry: (-entry['search_count'], entry['id']))
+    cache.set(TOP_CACHE_KEY, top[:TOP_SIZE], TOP_CACHE_TIMEOUT)
+
+search_counter = BufferedCounter(
+    'store.PopularSearch', 'search_count', key_field='category_id',
+    touch_updated_at=True, on_flush=merge_top
+)
+
+def increment_search_count(category):
+    """Count one search in category; returns the row with buffered hits included"""
+    from .models import PopularSearch
+
+    popular_search, created = PopularSearch.objects.get_or_create(category=category)
+    flushed = search_counter.incr(category.id)
+    popular_search.search_count += flushed.get(category.id, 0)
+    popular_search.search_count += search_counter.pending(category.id)
+    return popular_search
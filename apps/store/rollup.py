@@ -0,0 +1,114 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Max, Sum, Value, When
+from django.db.models.functions import Cast, Concat, TruncDate
+from django.utils import timezone
+
+# Rows younger than this are left for the next run: view batches from
+# several workers may commit slightly out of id order
+ROLLUP_LAG = timedelta(minutes=5)
+
+# Raw AdView rows are kept this many days after being rolled up
+RETENTION_DAYS = getattr(settings, 'AD_VIEW_RETENTION_DAYS', 90)
+
+BATCH_SIZE = 5000
+
+def get_visitor():
+    """Expression identifying a visitor: the user, or the IP when anonymous"""
+    return Case(
+        When(user__isnull=False, then=Concat(Value('user:'), Cast('user_id', CharField()))),
+        default=Concat(Value('ip:'), 'ip_address'),
+        output_field=CharField()
+    )
+
+def get_watermark():
+    """Highest AdView id already folded into AdViewDaily"""
+    from .models import AdViewDaily
+
+    return AdViewDaily.objects.aggregate(last_view_id=Max('last_view_id'))['last_view_id'] or 0
+
+def refresh_days(pairs, last_view_id):
+    """
+    Recompute the AdViewDaily rows for a set of (ad_id, day) pairs.
+
+    Unique visitors cannot be summed across batches, so each touched day is
+    recounted from its raw rows, all pairs in one grouped query.
+    """
+    from .models import AdView, AdViewDaily
+
+    days = [day for _, day in pairs]
+    current_timezone = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(min(days), time.min), current_timezone)
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min), current_timezone)
+
+    stats = AdView.objects.filter(
+        ad_id__in={ad_id for ad_id, _ in pairs}, created_at__gte=start, created_at__lt=end
+    ).annotate(day=TruncDate('created_at')).values('ad_id', 'day').annotate(
+        total=Count('id'), visitors=Count(get_visitor(), distinct=True)
+    ).order_by()
+
+    rows = [
+        AdViewDaily(
+            ad_id=row['ad_id'], day=row['day'], views=row['total'],
+            unique_visitors=row['visitors'], last_view_id=last_view_id
+        )
+        for row in stats if (row['ad_id'], row['day']) in pairs
+    ]
+    AdViewDaily.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['ad', 'day'],
+        update_fields=['views', 'unique_visitors', 'last_view_id', 'updated_at']
+    )
+    return len(rows)
+
+def rollup_views(batch_size=BATCH_SIZE, now=None):
+    """Fold AdView rows newer than the watermark into AdViewDaily; returns rows read"""
+    from .models import AdView
+
+    cutoff = (now or timezone.now()) - ROLLUP_LAG
+    watermark = get_watermark()
+    processed = 0
+    while True:
+        rows = list(
+            AdView.objects.filter(id__gt=watermark, created_at__lt=cutoff).annotate(
+                day=TruncDate('created_at')
+            ).order_by('id').values_list('id', 'ad_id', 'day')[:batch_size]
+        )
+        if not rows:
+            return processed
+
+        watermark = rows[-1][0]
+        with transaction.atomic():
+            refresh_days({(ad_id, day) for _, ad_id, day in rows}, watermark)
+        processed += len(rows)
+
+def prune_views(days=RETENTION_DAYS, batch_size=BATCH_SIZE, now=None):
+    """
+    Delete rolled-up AdView rows older than days, batch_size rows per statement.
+
+    Rows past the rollup watermark are kept whatever their age.
+    """
+    from .models import AdView
+
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    watermark = get_watermark()
+    deleted = 0
+    while True:
+        ids = list(
+            AdView.objects.filter(created_at__lt=cutoff, id__lte=watermark).order_by(
+                'created_at'
+            ).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += AdView.objects.filter(id__in=ids).delete()[0]
+
+def get_view_stats(ad, days=30):
+    """Daily views and unique visitors of ad over the last days, newest first"""
+    start = timezone.localdate() - timedelta(days=days - 1)
+    daily = ad.daily_views.filter(day__gte=start).order_by('-day')
+    totals = daily.aggregate(views=Sum('views'))
+    return {
+        'total_views': totals['views'] or 0,
+        'days': list(daily.values('day', 'views', 'unique_visitors')),
+    }
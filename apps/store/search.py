@@ -0,0 +1,204 @@
+import re
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.translation import get_language
+
+# Query terms beyond this are ignored to keep MATCH expressions cheap
+MAX_SEARCH_TERMS = 8
+
+# bm25 column weights: names count ten times more than descriptions
+SQLITE_RANK_WEIGHTS = '10.0, 10.0, 1.0, 1.0'
+
+SQLITE_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS store_ad_fts USING fts5(
+        name_uz, name_ru, description_uz, description_ru,
+        content='store_ad', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_ad_fts_insert AFTER INSERT ON store_ad BEGIN
+        INSERT INTO store_ad_fts(rowid, name_uz, name_ru, description_uz, description_ru)
+        VALUES (new.id, new.name_uz, new.name_ru, new.description_uz, new.description_ru);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_ad_fts_delete AFTER DELETE ON store_ad BEGIN
+        INSERT INTO store_ad_fts(store_ad_fts, rowid, name_uz, name_ru, description_uz, description_ru)
+        VALUES ('delete', old.id, old.name_uz, old.name_ru, old.description_uz, old.description_ru);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_ad_fts_update
+    AFTER UPDATE OF name_uz, name_ru, description_uz, description_ru ON store_ad BEGIN
+        INSERT INTO store_ad_fts(store_ad_fts, rowid, name_uz, name_ru, description_uz, description_ru)
+        VALUES ('delete', old.id, old.name_uz, old.name_ru, old.description_uz, old.description_ru);
+        INSERT INTO store_ad_fts(rowid, name_uz, name_ru, description_uz, description_ru)
+        VALUES (new.id, new.name_uz, new.name_ru, new.description_uz, new.description_ru);
+    END
+    """,
+]
+
+# Uzbek has no PostgreSQL dictionary, so it is indexed with 'simple';
+# Russian columns get the stemming 'russian' configuration.
+POSTGRESQL_INDEX_SQL = [
+    """
+    ALTER TABLE store_ad ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name_uz, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(name_ru, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description_uz, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(description_ru, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS store_ad_search_vector_idx
+    ON store_ad USING GIN (search_vector)
+    """,
+]
+
+def is_supported(conn=connection):
+    """Whether the database backend has a full-text index for ads"""
+    return conn.vendor in ('sqlite', 'postgresql')
+
+def install_search_index(conn, rebuild=False):
+    """
+    Create the ad full-text index if it is missing.
+
+    Safe to run repeatedly. On SQLite the sync triggers are dropped whenever
+    Django remakes the store_ad table, so this also runs after every migrate.
+    """
+    if conn.vendor == 'sqlite':
+        statements = SQLITE_INDEX_SQL
+    elif conn.vendor == 'postgresql':
+        statements = POSTGRESQL_INDEX_SQL
+    else:
+        return
+
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+        if rebuild and conn.vendor == 'sqlite':
+            cursor.execute("INSERT INTO store_ad_fts(store_ad_fts) VALUES ('rebuild')")
+
+def remove_search_index(conn):
+    """Drop the ad full-text index"""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for name in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS store_ad_fts_{name}')
+            cursor.execute('DROP TABLE IF EXISTS store_ad_fts')
+        elif conn.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS store_ad_search_vector_idx')
+            cursor.execute('ALTER TABLE store_ad DROP COLUMN IF EXISTS search_vector')
+
+def get_search_terms(text):
+    """Split user input into lowercase word tokens"""
+    return re.findall(r'\w+', (text or '').lower())[:MAX_SEARCH_TERMS]
+
+def search_ads(queryset, text, conn=connection):
+    """
+    Restrict an Ad queryset to full-text matches of text.
+
+    Every term must match as a word prefix in any of the four name and
+    description columns. The result is annotated with search_rank, where a
+    higher value is a better match; backends without a full-text index fall
+    back to substring matches with a constant rank.
+    """
+    terms = get_search_terms(text)
+    if not terms:
+        return queryset
+
+    if conn.vendor == 'sqlite':
+        match = ' '.join('"%s"*' % term for term in terms)
+        return queryset.filter(
+            id__in=RawSQL('SELECT rowid FROM store_ad_fts WHERE store_ad_fts MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25(store_ad_fts, {SQLITE_RANK_WEIGHTS}) FROM store_ad_fts '
+                'WHERE store_ad_fts MATCH %s AND store_ad_fts.rowid = store_ad.id',
+                [match],
+                output_field=FloatField()
+            )
+        )
+
+    if conn.vendor == 'postgresql':
+        tsquery = ' & '.join('%s:*' % term for term in terms)
+        tsquery_sql = "(to_tsquery('simple', %s) || to_tsquery('russian', %s))"
+        return queryset.filter(
+            RawSQL(
+                f'store_ad.search_vector @@ {tsquery_sql}',
+                [tsquery, tsquery],
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank_cd(store_ad.search_vector, {tsquery_sql})',
+                [tsquery, tsquery],
+                output_field=FloatField()
+            )
+        )
+
+    # No full-text index on other backends: unranked substring matches
+    for term in terms:
+        queryset = queryset.filter(
+            Q(name_uz__icontains=term) | Q(name_ru__icontains=term) |
+            Q(description_uz__icontains=term) | Q(description_ru__icontains=term)
+        )
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+def search_catalog(text, limit, offset):
+    """
+    Ranked, typed search over categories and active ads.
+
+    Returns (count, results): matching categories come first, most popular
+    first, served from the in-memory autocomplete index; products follow in
+    full-text rank order. The window is split between the two sources, so
+    only the requested slice of products is read from the database.
+    """
+    from .autocomplete import autocomplete_index
+    from .models import Ad
+
+    terms = get_search_terms(text)
+    if not terms:
+        return 0, []
+
+    categories = autocomplete_index.match_categories(terms)
+    products = Ad.objects.filter(is_active=True)
+    if is_supported():
+        products = search_ads(products, text).order_by('-search_rank', '-published_at', '-id')
+    else:
+        for term in terms:
+            products = products.filter(Q(name_uz__icontains=term) | Q(name_ru__icontains=term))
+        products = products.order_by('-view_count', '-id')
+
+    results = [
+        {
+            'id': category.id,
+            'name': f'{category.name_uz} / {category.name_ru}',
+            'type': 'category',
+            'icon': category.icon,
+        }
+        for category in categories[offset:offset + limit]
+    ]
+
+    product_offset = max(offset - len(categories), 0)
+    product_limit = limit - len(results)
+    if product_limit > 0:
+        rows = products.values_list('id', 'name_uz', 'name_ru', 'category__icon')[
+            product_offset:product_offset + product_limit
+        ]
+        language = get_language()
+        results.extend(
+            {
+                'id': pk,
+                'name': name_ru if language == 'ru' else name_uz,
+                'type': 'product',
+                'icon': icon or None,
+            }
+            for pk, name_uz, name_ru, icon in rows
+        )
+
+    return len(categories) + products.count(), results
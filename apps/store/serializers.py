@@ -1,7 +1,17 @@
+from functools import cache
+from types import SimpleNamespace
 from rest_framework import serializers
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.utils.translation import get_language
+from modeltranslation.settings import AVAILABLE_LANGUAGES
 from apps.accounts.serializers import UserProfileSerializer
-from .models import Category, Ad, AdPhoto, AdLike
+from apps.common.response_cache import invalidate_responses
+from .autocomplete import autocomplete_index
+from .category_tree import get_breadcrumbs
+from .models import Category, Ad, AdPhoto, AdLike, PopularSearch
+from .utils import allocate_unique_slugs
 
 class CategorySerializer(serializers.ModelSerializer):
     """Basic category serializer"""
@@ -53,6 +63,38 @@ class AdPhotoSerializer(serializers.ModelSerializer):
         model = AdPhoto
         fields = ['id', 'image', 'order']
 
+LIST_PHOTOS_LIMIT = 3
+
+def list_photos_prefetch():
+    """Prefetch the first LIST_PHOTOS_LIMIT photos of every ad in one windowed query"""
+    return Prefetch(
+        'photos',
+        queryset=AdPhoto.objects.only('id', 'ad', 'image', 'order').order_by(
+            'order', 'id'
+        )[:LIST_PHOTOS_LIMIT],
+        to_attr='list_photos'
+    )
+
+def get_liked_ad_ids(user, ad_ids):
+    """Return the subset of ad_ids liked by user in a single query"""
+    if not user or not user.is_authenticated or not ad_ids:
+        return set()
+    return set(
+        AdLike.objects.filter(user=user, ad_id__in=ad_ids).values_list('ad_id', flat=True)
+    )
+
+class AdListListSerializer(serializers.ListSerializer):
+    """Resolves is_liked for the whole page before serializing rows"""
+    
+    def to_representation(self, data):
+        ads = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request is not None and 'liked_ad_ids' not in self.context:
+            self.context['liked_ad_ids'] = get_liked_ad_ids(
+                request.user, [ad.id for ad in ads]
+            )
+        return super().to_representation(ads)
+
 class AdListSerializer(serializers.ModelSerializer):
     """Ad list serializer"""
     name = serializers.SerializerMethodField()
@@ -68,6 +110,7 @@ class AdListSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'price', 'category',
             'seller', 'photos', 'is_liked', 'view_count', 'published_at'
         ]
+        list_serializer_class = AdListListSerializer
     
     def get_name(self, obj):
         return obj.name
@@ -78,15 +121,131 @@ class AdListSerializer(serializers.ModelSerializer):
         return desc[:200] + '...' if len(desc) > 200 else desc
     
     def get_photos(self, obj):
-        photos = obj.photos.all()[:3]  # First 3 photos for list view
+        # First photos for list view, prefetched by list_photos_prefetch()
+        photos = getattr(obj, 'list_photos', None)
+        if photos is None:
+            photos = obj.photos.all()[:LIST_PHOTOS_LIMIT]
         return [photo.image.url for photo in photos]
     
     def get_is_liked(self, obj):
+        liked_ad_ids = self.context.get('liked_ad_ids')
+        if liked_ad_ids is not None:
+            return obj.id in liked_ad_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return AdLike.objects.filter(user=request.user, ad=obj).exists()
         return False
 
+def localized_name(field, language):
+    """The model attribute Ad.name / Category.name read for language"""
+    return f'{field}_ru' if language == 'ru' else f'{field}_uz'
+
+@cache
+def get_list_fields():
+    """Serializer fields whose formatting the projection path reuses"""
+    ad_fields = AdListSerializer().fields
+    return ad_fields['price'], ad_fields['published_at'], ad_fields['seller'].fields['created_at']
+
+def project_ad_list(queryset, language=None):
+    """
+    Reduce an Ad queryset to the columns AdListSerializer reads.
+    
+    The result feeds serialize_ad_rows. Translated Ad columns resolve their
+    fallbacks in values() itself; related Category names are not rewritten
+    there, so every localized column is selected and resolved per row.
+    """
+    language = language or get_language()
+    category_name = localized_name('name', language)
+    return queryset.prefetch_related(None).values(
+        'id', localized_name('name', language), 'slug', localized_name('description', language),
+        'price', 'view_count', 'published_at',
+        'category_id', 'category__slug', 'category__icon',
+        *(f'category__{category_name}_{lang}' for lang in AVAILABLE_LANGUAGES),
+        'seller_id', 'seller__full_name', 'seller__phone_number', 'seller__profile_photo',
+        'seller__created_at', 'seller__role',
+        'seller__address_id', 'seller__address__name', 'seller__address__lat', 'seller__address__long',
+    )
+
+def get_list_photo_urls(ad_ids):
+    """URLs of the first LIST_PHOTOS_LIMIT photos of each ad, in one windowed query"""
+    storage = AdPhoto._meta.get_field('image').storage
+    photos = AdPhoto.objects.filter(ad_id__in=ad_ids).annotate(
+        position=Window(RowNumber(), partition_by=[F('ad_id')], order_by=[F('order').asc(), F('id').asc()])
+    ).filter(position__lte=LIST_PHOTOS_LIMIT).order_by('order', 'id').values_list('ad_id', 'image')
+    urls = {}
+    for ad_id, image in photos:
+        urls.setdefault(ad_id, []).append(storage.url(image))
+    return urls
+
+def serialize_ad_rows(rows, request=None, language=None):
+    """
+    AdListSerializer output built straight from project_ad_list rows.
+    
+    Skips model instances and nested serializers; the JSON is identical
+    to AdListSerializer(rows, many=True) for the same language.
+    """
+    language = language or get_language()
+    rows = list(rows)
+    ad_ids = [row['id'] for row in rows]
+    liked_ad_ids = get_liked_ad_ids(getattr(request, 'user', None), ad_ids)
+    photo_urls = get_list_photo_urls(ad_ids) if ad_ids else {}
+    price_field, published_at_field, created_at_field = get_list_fields()
+    
+    name = localized_name('name', language)
+    description = localized_name('description', language)
+    category_name = getattr(Category, name)
+    category_columns = [(f'category__{name}_{lang}', f'{name}_{lang}') for lang in AVAILABLE_LANGUAGES]
+    icon_storage = Category._meta.get_field('icon').storage
+    photo_storage = Ad._meta.get_field('seller').related_model._meta.get_field('profile_photo').storage
+    
+    def media_url(storage, file_name):
+        # Same as DRF's ImageField: absolute when there is a request
+        if not file_name:
+            return None
+        url = storage.url(file_name)
+        return request.build_absolute_uri(url) if request is not None else url
+    
+    results = []
+    for row in rows:
+        desc = row[description]
+        category = SimpleNamespace(**{column: row[key] for key, column in category_columns})
+        address = None
+        if row['seller__address_id'] is not None:
+            lat, long = row['seller__address__lat'], row['seller__address__long']
+            address = {
+                'id': row['seller__address_id'],
+                'name': row['seller__address__name'],
+                'lat': None if lat is None else float(lat),
+                'long': None if long is None else float(long),
+            }
+        results.append({
+            'id': row['id'],
+            'name': row[name],
+            'slug': row['slug'],
+            'description': desc[:200] + '...' if len(desc) > 200 else desc,
+            'price': price_field.to_representation(row['price']),
+            'category': {
+                'id': row['category_id'],
+                'name': category_name.__get__(category, Category),
+                'slug': row['category__slug'],
+                'icon': media_url(icon_storage, row['category__icon']),
+            },
+            'seller': {
+                'id': row['seller_id'],
+                'full_name': row['seller__full_name'],
+                'phone_number': row['seller__phone_number'],
+                'profile_photo': media_url(photo_storage, row['seller__profile_photo']),
+                'address': address,
+                'created_at': created_at_field.to_representation(row['seller__created_at']),
+                'role': row['seller__role'],
+            },
+            'photos': photo_urls.get(row['id'], []),
+            'is_liked': row['id'] in liked_ad_ids,
+            'view_count': row['view_count'],
+            'published_at': published_at_field.to_representation(row['published_at']),
+        })
+    return results
+
 class AdDetailSerializer(serializers.ModelSerializer):
     """Detailed ad serializer"""
     name = serializers.SerializerMethodField()
@@ -96,14 +255,15 @@ class AdDetailSerializer(serializers.ModelSerializer):
     photos = AdPhotoSerializer(many=True, read_only=True)
     is_liked = serializers.SerializerMethodField()
     address = serializers.SerializerMethodField()
+    breadcrumbs = serializers.SerializerMethodField()
     updated_time = serializers.DateTimeField(source='updated_at', read_only=True)
     
     class Meta:
         model = Ad
         fields = [
             'id', 'name', 'slug', 'description', 'price', 'category',
-            'seller', 'photos', 'is_liked', 'view_count', 'published_at',
-            'address', 'updated_time'
+            'breadcrumbs', 'seller', 'photos', 'is_liked', 'view_count',
+            'published_at', 'address', 'updated_time'
         ]
     
     def get_name(self, obj):
@@ -118,6 +278,9 @@ class AdDetailSerializer(serializers.ModelSerializer):
             return AdLike.objects.filter(user=request.user, ad=obj).exists()
         return False
     
+    def get_breadcrumbs(self, obj):
+        return get_breadcrumbs(obj.category_id)
+    
     def get_address(self, obj):
         if obj.seller.address:
             return obj.seller.address.name
@@ -150,6 +313,77 @@ class AdCreateSerializer(serializers.ModelSerializer):
         
         return ad
 
+# Most ads one bulk request may create
+MAX_BULK_ADS = 500
+
+# Fresh slug allocations tried when a concurrent insert takes one first
+BULK_SLUG_ATTEMPTS = 3
+
+class AdBulkItemSerializer(AdCreateSerializer):
+    """One ad of a bulk request; its category is looked up for the whole batch"""
+    category = serializers.IntegerField(min_value=1)
+    
+    def validate_category(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+class AdBulkCreateSerializer(serializers.Serializer):
+    """
+    Create many ads of the current seller at once.
+    
+    Categories are checked with one query, slugs come from one query, and
+    ads and photos are inserted with bulk_create in a single transaction:
+    either every ad is created or none is.
+    """
+    ads = AdBulkItemSerializer(many=True, allow_empty=False, max_length=MAX_BULK_ADS)
+    
+    def to_internal_value(self, data):
+        ads = data.get('ads') if isinstance(data, dict) else None
+        ids = {
+            str(ad.get('category')) for ad in (ads if isinstance(ads, list) else [])
+            if isinstance(ad, dict)
+        }
+        self.context['category_ids'] = set(Category.objects.filter(
+            id__in=[int(value) for value in ids if value.isdigit()]
+        ).values_list('id', flat=True))
+        return super().to_internal_value(data)
+    
+    def create(self, validated_data):
+        items = validated_data['ads']
+        seller = self.context['request'].user
+        for attempt in range(BULK_SLUG_ATTEMPTS):
+            slugs = allocate_unique_slugs(Ad, [item['name_uz'] for item in items])
+            try:
+                with transaction.atomic():
+                    ads = Ad.objects.bulk_create([
+                        Ad(
+                            seller=seller, slug=slug, category_id=item['category'],
+                            **{name: value for name, value in item.items() if name not in ('category', 'photos')}
+                        )
+                        for item, slug in zip(items, slugs)
+                    ])
+                    AdPhoto.objects.bulk_create([
+                        AdPhoto(ad=ad, image=photo, order=order)
+                        for ad, item in zip(ads, items)
+                        for order, photo in enumerate(item.get('photos', []))
+                    ])
+                break
+            except IntegrityError:
+                # Allocate again only when a concurrent insert took one of the slugs
+                lost_slug = Ad.objects.filter(slug__in=slugs).exists()
+                if attempt == BULK_SLUG_ATTEMPTS - 1 or not lost_slug:
+                    raise
+        
+        # bulk_create sends no post_save, so do what its receivers would
+        invalidate_responses('ads')
+        for ad in ads:
+            autocomplete_index.update(
+                'product', ad.id, ad.name_uz, ad.name_ru,
+                autocomplete_index.get_icon('category', ad.category_id), 0
+            )
+        return ads
+
 class AdUpdateSerializer(serializers.ModelSerializer):
     """Ad update serializer"""
     
@@ -174,3 +408,11 @@ class AdLikeSerializer(serializers.ModelSerializer):
         model = AdLike
         fields = ['id', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+class PopularSearchSerializer(serializers.ModelSerializer):
+    """Category search counter"""
+    
+    class Meta:
+        model = PopularSearch
+        fields = ['id', 'category', 'search_count', 'updated_at']
+        read_only_fields = fields
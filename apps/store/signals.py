@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.common.models import Address
+from apps.common.response_cache import invalidate_responses
+from .autocomplete import autocomplete_index
+from .category_tree import invalidate_category_tree
+from .popular import invalidate_top
+from .models import Ad, AdPhoto, Category
+
+User = get_user_model()
+
+@receiver(post_save, sender=Ad)
+def index_ad(sender, instance, **kwargs):
+    """Keep the autocomplete index in step with ad edits and deactivation"""
+    if not instance.is_active:
+        autocomplete_index.remove('product', instance.id)
+        return
+    autocomplete_index.update(
+        'product', instance.id, instance.name_uz, instance.name_ru,
+        autocomplete_index.get_icon('category', instance.category_id),
+        instance.view_count
+    )
+
+@receiver(post_delete, sender=Ad)
+def unindex_ad(sender, instance, **kwargs):
+    autocomplete_index.remove('product', instance.id)
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    invalidate_category_tree()
+    invalidate_top()
+    if not instance.is_active:
+        autocomplete_index.remove('category', instance.id)
+        return
+    autocomplete_index.update(
+        'category', instance.id, instance.name_uz, instance.name_ru,
+        instance.icon.name if instance.icon else None
+    )
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    invalidate_category_tree()
+    invalidate_top()
+    autocomplete_index.remove('category', instance.id)
+
+@receiver([post_save, post_delete], sender=Ad)
+@receiver([post_save, post_delete], sender=AdPhoto)
+def invalidate_ad_responses(sender, instance, **kwargs):
+    ad_id = instance.ad_id if sender is AdPhoto else instance.id
+    invalidate_responses('ads', f'ad:{ad_id}')
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    invalidate_responses('categories')
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_responses(sender, instance, **kwargs):
+    # Ads embed their seller's profile
+    invalidate_responses(f'user:{instance.id}')
+
+@receiver([post_save, post_delete], sender=Address)
+def invalidate_address_responses(sender, instance, **kwargs):
+    user_ids = set(User.objects.filter(address=instance).values_list('id', flat=True))
+    user_ids.add(instance.user_id)
+    invalidate_responses(*(f'user:{user_id}' for user_id in user_ids if user_id))
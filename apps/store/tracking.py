@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from apps.common.counters import BufferedInserts
+
+# A visitor counts as one view per ad within this window
+VIEW_DEDUP_TIMEOUT = 60 * 60
+
+# AdView rows are inserted in batches off the request thread
+view_log = BufferedInserts('store.AdView', background=True)
+
+def record_view(ad_id, user=None, ip_address=None):
+    """
+    Queue an AdView unless this visitor already viewed the ad in the last hour.
+
+    Visitors are told apart by user id, or by IP for anonymous requests.
+    The check is a single atomic cache.add, so detail requests never read
+    the AdView table. Returns whether the view was new.
+    """
+    visitor = f'user:{user.pk}' if user is not None else f'ip:{ip_address}'
+    if not cache.add(f'store:ad_view:{ad_id}:{visitor}', 1, VIEW_DEDUP_TIMEOUT):
+        return False
+    view_log.add(ad_id=ad_id, user_id=user.pk if user is not None else None, ip_address=ip_address)
+    return True
@@ -0,0 +1,101 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.common.response_cache import invalidate_responses
+
+# A view, like or publication counts half as much after this many hours
+HALF_LIFE_HOURS = getattr(settings, 'STORE_TRENDING_HALF_LIFE_HOURS', 48)
+
+# Activity older than this weighs under 1% and is not read at all
+WINDOW_DAYS = getattr(settings, 'STORE_TRENDING_WINDOW_DAYS', 14)
+
+# Ads kept per ranking, globally and for each category
+TRENDING_SIZE = 20
+
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 5.0
+FRESHNESS_WEIGHT = 10.0
+
+def decay(age):
+    """Exponential decay factor for an event age given as a timedelta"""
+    hours = max(age.total_seconds() / 3600, 0)
+    return 0.5 ** (hours / HALF_LIFE_HOURS)
+
+def compute_scores(now=None):
+    """
+    Trending score of every active ad with activity inside the window.
+
+    Daily views come from the AdViewDaily rollup, counted at midday of
+    their day; likes and publication add decayed bonuses. Returns
+    {ad_id: (score, category_path)}.
+    """
+    from .models import Ad, AdLike, AdViewDaily
+
+    now = now or timezone.now()
+    since = now - timedelta(days=WINDOW_DAYS)
+    current_timezone = timezone.get_current_timezone()
+    scores = defaultdict(float)
+    paths = {}
+
+    daily = AdViewDaily.objects.filter(
+        day__gte=timezone.localdate(since), ad__is_active=True
+    ).values_list('ad_id', 'ad__category__path', 'day', 'views')
+    for ad_id, path, day, views in daily.iterator(chunk_size=2000):
+        midday = timezone.make_aware(datetime.combine(day, time(12)), current_timezone)
+        scores[ad_id] += VIEW_WEIGHT * views * decay(now - midday)
+        paths[ad_id] = path
+
+    likes = AdLike.objects.filter(
+        created_at__gte=since, ad__is_active=True
+    ).values_list('ad_id', 'ad__category__path', 'created_at')
+    for ad_id, path, created_at in likes.iterator(chunk_size=2000):
+        scores[ad_id] += LIKE_WEIGHT * decay(now - created_at)
+        paths[ad_id] = path
+
+    published = Ad.objects.filter(
+        is_active=True, published_at__gte=since
+    ).values_list('id', 'category__path', 'published_at')
+    for ad_id, path, published_at in published.iterator(chunk_size=2000):
+        scores[ad_id] += FRESHNESS_WEIGHT * decay(now - published_at)
+        paths[ad_id] = path
+
+    return {ad_id: (score, paths[ad_id]) for ad_id, score in scores.items()}
+
+def rank(ad_ids, scores):
+    """Top ads by score, newer ads first on ties"""
+    return heapq.nlargest(TRENDING_SIZE, ad_ids, key=lambda ad_id: (scores[ad_id][0], ad_id))
+
+def update_trending(now=None):
+    """
+    Recompute the global and per-category rankings into TrendingAd.
+
+    An ad ranks in its own category and in every ancestor, so a root
+    category lists trending ads from its whole subtree. The table is
+    replaced in one transaction; returns the number of rows written.
+    """
+    from .models import TrendingAd
+
+    scores = compute_scores(now)
+    by_category = defaultdict(list)
+    for ad_id, (_, path) in scores.items():
+        for category_id in path.strip('/').split('/'):
+            if category_id:
+                by_category[int(category_id)].append(ad_id)
+
+    rankings = {None: rank(scores, scores)}
+    for category_id, ad_ids in by_category.items():
+        rankings[category_id] = rank(ad_ids, scores)
+
+    rows = [
+        TrendingAd(category_id=category_id, ad_id=ad_id, rank=position, score=scores[ad_id][0])
+        for category_id, ad_ids in rankings.items()
+        for position, ad_id in enumerate(ad_ids, start=1)
+    ]
+    with transaction.atomic():
+        TrendingAd.objects.all().delete()
+        TrendingAd.objects.bulk_create(rows, batch_size=1000)
+    invalidate_responses('trending')
+    return len(rows)
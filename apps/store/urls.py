@@ -1,8 +1,9 @@
 from django.urls import path
 from .views import (
     CategoryListView, CategoryWithChildsView, AdListView, AdDetailView,
-    AdCreateView, AdUpdateView, AdLikeView, MyAdsView, PopularAdsView,
-    FeaturedAdsView
+    AdCreateView, AdUpdateView, AdLikeView, AdViewStatsView, MyAdsView, PopularAdsView,
+    FeaturedAdsView, SearchCompleteView, PopularSearchListView, SearchCountIncreaseView,
+    CategoryProductSearchView, AdExportView, AdBulkCreateView
 )
 
 app_name = 'store'
@@ -15,10 +16,19 @@ urlpatterns = [
     # Advertisements
     path('store/ads/', AdListView.as_view(), name='ads_list'),
     path('store/ads/create/', AdCreateView.as_view(), name='ads_create'),
+    path('store/ads/bulk-create/', AdBulkCreateView.as_view(), name='ads_bulk_create'),
     path('store/ads/my/', MyAdsView.as_view(), name='my_ads'),
     path('store/ads/popular/', PopularAdsView.as_view(), name='popular_ads'),
     path('store/ads/featured/', FeaturedAdsView.as_view(), name='featured_ads'),
+    path('store/ads/export/', AdExportView.as_view(), name='ads_export'),
     path('store/ads/<slug:slug>/', AdDetailView.as_view(), name='ads_detail'),
     path('store/ads/<slug:slug>/edit/', AdUpdateView.as_view(), name='ads_update'),
     path('store/ads/<slug:slug>/like/', AdLikeView.as_view(), name='ads_like'),
+    path('store/ads/<slug:slug>/stats/', AdViewStatsView.as_view(), name='ads_stats'),
+    
+    # Search
+    path('store/search/complete/', SearchCompleteView.as_view(), name='search_complete'),
+    path('store/search/category-product/', CategoryProductSearchView.as_view(), name='search_category_product'),
+    path('store/search/populars/', PopularSearchListView.as_view(), name='search_populars'),
+    path('store/search/count-increase/<int:id>/', SearchCountIncreaseView.as_view(), name='search_count_increase'),
 ]
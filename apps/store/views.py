@@ -1,24 +1,68 @@
+import ipaddress
+import json
+from collections.abc import Mapping
 from rest_framework import status, permissions
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, RetrieveAPIView, CreateAPIView, RetrieveUpdateDestroyAPIView
+from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
-from apps.common.permissions import IsSeller, IsOwnerOrReadOnly
-from .models import Category, Ad, AdLike, AdView
+from apps.common.pagination import KeysetResultsSetPagination, SearchResultsSetPagination
+from apps.common.response_cache import CachedResponseMixin
+from apps.common.exports import EXPORT_FORMATS, export_response
+from apps.common.permissions import IsAdmin, IsSeller, IsOwnerOrReadOnly
+from .models import Category, Ad, AdLike, view_counter
+from .popular import get_top, increment_search_count
+from .rollup import get_view_stats
+from .search import search_catalog
+from .tracking import record_view
+from .trending import TRENDING_SIZE
 from .serializers import (
     CategorySerializer, CategoryWithChildsSerializer, AdListSerializer,
-    AdDetailSerializer, AdCreateSerializer, AdUpdateSerializer, AdLikeSerializer
+    AdDetailSerializer, AdCreateSerializer, AdBulkCreateSerializer, AdUpdateSerializer, AdLikeSerializer,
+    PopularSearchSerializer, project_ad_list, serialize_ad_rows
 )
-from .filters import AdFilter
+from .autocomplete import autocomplete_index
+from .category_tree import get_category_tree
+from .exports import AD_EXPORT_COLUMNS, iter_ad_rows
+from .filters import AdFilter, AdSearchFilter
 
-class CategoryListView(ListAPIView):
+def build_media_url(request, name):
+    """Absolute URL for a stored file name, None when empty"""
+    if not name:
+        return None
+    return request.build_absolute_uri(default_storage.url(name))
+
+class AdListProjectionMixin:
+    """Serve AdListSerializer output from a .values() projection, without model instances"""
+    
+    def list(self, request, *args, **kwargs):
+        queryset = project_ad_list(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_ad_rows(page, request))
+        return Response(serialize_ad_rows(queryset, request))
+
+class CachedAdListMixin(CachedResponseMixin):
+    """Response cache for ad lists, also dropped when a listed seller changes"""
+    cache_tags = ['ads', 'categories']
+    
+    def get_cache_tags(self, data):
+        ads = data['results'] if isinstance(data, dict) else data
+        return super().get_cache_tags(data) + [
+            f'user:{ad["seller"]["id"]}' for ad in ads if ad.get('seller')
+        ]
+
+class CategoryListView(CachedResponseMixin, ListAPIView):
     """List all active categories"""
     queryset = Category.objects.filter(is_active=True, parent=None)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    cache_tags = ['categories']
     
     @extend_schema(
         responses={200: CategorySerializer(many=True)},
@@ -28,8 +72,9 @@ class CategoryListView(ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class CategoryWithChildsView(ListAPIView):
+class CategoryWithChildsView(CachedResponseMixin, ListAPIView):
     """List categories with all nested children"""
+    cache_tags = ['categories']
     queryset = Category.objects.filter(is_active=True, parent=None)
     serializer_class = CategoryWithChildsSerializer
     permission_classes = [permissions.AllowAny]
@@ -41,12 +86,21 @@ class CategoryWithChildsView(ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
+    
+    def list(self, request, *args, **kwargs):
+        # Served from the cached tree instead of one query per node
+        tree = get_category_tree(request)
+        page = self.paginate_queryset(tree)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(tree)
 
-class AdListView(ListAPIView):
+class AdListView(CachedAdListMixin, AdListProjectionMixin, ListAPIView):
     """List ads with filtering and search"""
     serializer_class = AdListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = KeysetResultsSetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, AdSearchFilter]
     filterset_class = AdFilter
     search_fields = ['name_uz', 'name_ru', 'description_uz', 'description_ru']
     ordering_fields = ['price', 'published_at', 'view_count']
@@ -55,16 +109,18 @@ class AdListView(ListAPIView):
     def get_queryset(self):
         return Ad.objects.filter(is_active=True).select_related(
             'category', 'seller', 'seller__address'
-        ).prefetch_related('photos')
+        )
     
     @extend_schema(
         parameters=[
-            OpenApiParameter('category', int, description='Filter by category ID'),
+            OpenApiParameter('category', int, description='Filter by category ID, including its subcategories'),
+            OpenApiParameter('category_ids', str, description='Comma-separated category IDs, e.g. 15,16,17; subcategories included'),
             OpenApiParameter('min_price', float, description='Minimum price filter'),
             OpenApiParameter('max_price', float, description='Maximum price filter'),
             OpenApiParameter('seller', int, description='Filter by seller ID'),
             OpenApiParameter('search', str, description='Search in name and description'),
             OpenApiParameter('ordering', str, description='Order by: price, -price, published_at, -published_at, view_count, -view_count'),
+            OpenApiParameter('cursor', str, description='Keyset pagination token; pass empty for the first page'),
         ],
         responses={200: AdListSerializer(many=True)},
         summary='List advertisements',
@@ -73,18 +129,55 @@ class AdListView(ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class AdDetailView(RetrieveAPIView):
+class AdExportView(APIView):
+    """Admin export of advertisements as a streamed CSV or NDJSON file"""
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('file_format', str, description='csv (default) or ndjson'),
+            OpenApiParameter('category', int, description='Filter by category ID, including its subcategories'),
+            OpenApiParameter('category_ids', str, description='Comma-separated category IDs; subcategories included'),
+            OpenApiParameter('min_price', float, description='Minimum price filter'),
+            OpenApiParameter('max_price', float, description='Maximum price filter'),
+            OpenApiParameter('seller', int, description='Filter by seller ID'),
+            OpenApiParameter('is_featured', bool, description='Filter by featured status'),
+            OpenApiParameter('published_after', str, description='Published at or after this datetime'),
+            OpenApiParameter('published_before', str, description='Published at or before this datetime'),
+        ],
+        responses={
+            200: OpenApiResponse(description='Streamed file with one row per advertisement'),
+            400: OpenApiResponse(description='Invalid filter or format'),
+        },
+        summary='Export advertisements',
+        description='Admin endpoint streaming all matching advertisements, active or not, in id order'
+    )
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'file_format': f'Choose one of: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filterset = AdFilter(request.query_params, queryset=Ad.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(iter_ad_rows(filterset.qs), AD_EXPORT_COLUMNS, file_format, 'ads')
+
+class AdDetailView(CachedResponseMixin, RetrieveAPIView):
     """Get ad details by slug"""
     queryset = Ad.objects.filter(is_active=True)
     serializer_class = AdDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
+    cache_tags = ['categories']
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
         # Track view
-        self.track_view(request, instance)
+        self.track_view(request, instance.pk)
         
         # Increment view count
         instance.increment_view_count()
@@ -92,28 +185,30 @@ class AdDetailView(RetrieveAPIView):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
-    def track_view(self, request, ad):
+    def get_cache_tags(self, data):
+        return super().get_cache_tags(data) + [f'ad:{data["id"]}', f'user:{data["seller"]["id"]}']
+    
+    def cached_response_hit(self, request, data):
+        # Cached pages still count as views
+        self.track_view(request, data['id'])
+        view_counter.incr(data['id'])
+    
+    def track_view(self, request, ad_id):
         """Track ad view"""
         user = request.user if request.user.is_authenticated else None
-        ip_address = self.get_client_ip(request)
-        
-        # Avoid duplicate views from same user/IP in short time
-        if not AdView.objects.filter(
-            ad=ad,
-            user=user,
-            ip_address=ip_address,
-            created_at__gte=timezone.now() - timezone.timedelta(hours=1)
-        ).exists():
-            AdView.objects.create(ad=ad, user=user, ip_address=ip_address)
+        record_view(ad_id, user, self.get_client_ip(request))
     
     def get_client_ip(self, request):
-        """Get client IP address"""
+        """Get client IP address, None when it is not a valid address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
+            ip = x_forwarded_for.split(',')[0].strip()
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip
+        try:
+            return str(ipaddress.ip_address(ip))
+        except ValueError:
+            return None
     
     @extend_schema(
         responses={200: AdDetailSerializer},
@@ -137,6 +232,56 @@ class AdCreateView(CreateAPIView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
+class AdBulkCreateView(APIView):
+    """Create many advertisements in one request"""
+    permission_classes = [IsSeller]
+    parser_classes = [JSONParser, MultiPartParser]
+    
+    def get_payload(self, request):
+        """
+        The ads list of a JSON body, or of a multipart body whose 'ads' field
+        holds the JSON and whose files photos_<index> belong to ad <index>
+        """
+        if isinstance(request.data.get('ads'), str):
+            ads = json.loads(request.data['ads'])
+            if isinstance(ads, list):
+                for index, ad in enumerate(ads):
+                    if isinstance(ad, dict):
+                        ad['photos'] = request.FILES.getlist(f'photos_{index}')
+            return {'ads': ads}
+        return request.data
+    
+    @extend_schema(
+        request=AdBulkCreateSerializer,
+        responses={
+            201: OpenApiResponse(description='Id and slug of each created advertisement, in request order'),
+            400: OpenApiResponse(description='Errors of each advertisement, in request order; nothing is created'),
+        },
+        summary='Create advertisements in bulk',
+        description=(
+            'Create up to 500 advertisements at once (seller only). Send JSON {"ads": [...]}, or multipart '
+            'with the same list as JSON in the "ads" field and the photos of ad N as files "photos_N".'
+        )
+    )
+    def post(self, request):
+        if not isinstance(request.data, Mapping):
+            return Response(
+                {'non_field_errors': ['Expected an object with an "ads" list.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            data = self.get_payload(request)
+        except ValueError:
+            return Response({'ads': ['Expected a JSON list.']}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = AdBulkCreateSerializer(data=data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        ads = serializer.save()
+        return Response(
+            {'created': len(ads), 'results': [{'id': ad.id, 'slug': ad.slug} for ad in ads]},
+            status=status.HTTP_201_CREATED
+        )
+
 class AdUpdateView(RetrieveUpdateDestroyAPIView):
     """Update/delete advertisement"""
     serializer_class = AdUpdateSerializer
@@ -208,10 +353,31 @@ class AdLikeView(APIView):
                 status=status.HTTP_200_OK
             )
 
-class MyAdsView(ListAPIView):
+class AdViewStatsView(APIView):
+    """Daily view statistics of the current seller's advertisement"""
+    permission_classes = [IsSeller]
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('days', int, description='Number of days, 1 to 365 (default 30)'),
+        ],
+        responses={200: OpenApiResponse(description='Daily views and unique visitors')},
+        summary='Get advertisement view statistics',
+        description='Daily views of own advertisement from the rollup table, updated by rollup_ad_views'
+    )
+    def get(self, request, slug):
+        ad = get_object_or_404(Ad, slug=slug, seller=request.user)
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            days = 30
+        return Response(get_view_stats(ad, days), status=status.HTTP_200_OK)
+
+class MyAdsView(AdListProjectionMixin, ListAPIView):
     """List current user's advertisements"""
     serializer_class = AdListSerializer
     permission_classes = [IsSeller]
+    pagination_class = KeysetResultsSetPagination
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['name_uz', 'name_ru']
     ordering_fields = ['published_at', 'view_count', 'price']
@@ -220,7 +386,7 @@ class MyAdsView(ListAPIView):
     def get_queryset(self):
         return Ad.objects.filter(seller=self.request.user).select_related(
             'category'
-        ).prefetch_related('photos')
+        )
     
     @extend_schema(
         responses={200: AdListSerializer(many=True)},
@@ -230,33 +396,64 @@ class MyAdsView(ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class PopularAdsView(ListAPIView):
-    """List popular advertisements"""
+class PopularAdsView(CachedAdListMixin, AdListProjectionMixin, ListAPIView):
+    """List trending advertisements"""
     serializer_class = AdListSerializer
     permission_classes = [permissions.AllowAny]
+    cache_tags = ['ads', 'categories', 'trending']
+    
+    ranked = True
     
     def get_queryset(self):
-        return Ad.objects.filter(is_active=True).select_related(
+        queryset = Ad.objects.filter(is_active=True).select_related(
             'category', 'seller'
-        ).prefetch_related('photos').order_by('-view_count')[:20]
+        )
+        category = self.request.query_params.get('category')
+        category_id = int(category) if category and category.isdigit() else None
+        
+        if not self.ranked:
+            if category_id is not None:
+                queryset = queryset.filter(category__path__contains=f'/{category_id}/')
+            return queryset.order_by('-view_count', '-id')[:TRENDING_SIZE]
+        
+        # One filter() call, so both conditions apply to the same inner join
+        if category_id is not None:
+            queryset = queryset.filter(trending_ranks__category_id=category_id)
+        else:
+            queryset = queryset.filter(
+                trending_ranks__category__isnull=True, trending_ranks__rank__isnull=False
+            )
+        return queryset.order_by('trending_ranks__rank')[:TRENDING_SIZE]
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not response.data['count']:
+            # Rankings not computed yet (see update_trending)
+            self.ranked = False
+            response = super().list(request, *args, **kwargs)
+        return response
     
     @extend_schema(
+        parameters=[
+            OpenApiParameter('category', int, description='Trending within a category and its subcategories'),
+        ],
         responses={200: AdListSerializer(many=True)},
         summary='Get popular advertisements',
-        description='Get list of most viewed advertisements'
+        description='Get trending advertisements ranked by recent views, likes and freshness'
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class FeaturedAdsView(ListAPIView):
+class FeaturedAdsView(CachedAdListMixin, AdListProjectionMixin, ListAPIView):
     """List featured advertisements"""
     serializer_class = AdListSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetResultsSetPagination
     
     def get_queryset(self):
         return Ad.objects.filter(is_active=True, is_featured=True).select_related(
             'category', 'seller'
-        ).prefetch_related('photos').order_by('-published_at')
+        ).order_by('-published_at')
     
     @extend_schema(
         responses={200: AdListSerializer(many=True)},
@@ -265,3 +462,101 @@ class FeaturedAdsView(ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
+
+class SearchCompleteView(APIView):
+    """Autocomplete ad and category names"""
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchResultsSetPagination
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', str, description='Typed prefix'),
+            OpenApiParameter('limit', int, description='Number of results to return'),
+            OpenApiParameter('offset', int, description='Index of the first result'),
+        ],
+        responses={200: OpenApiResponse(description='Paginated name suggestions')},
+        summary='Search autocomplete',
+        description='Suggest ad and category names starting with the query, most popular first'
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        paginator = self.pagination_class()
+        results = paginator.paginate_results(
+            request,
+            lambda limit, offset: autocomplete_index.complete(query, limit, offset)
+        )
+        for item in results:
+            item['icon'] = build_media_url(request, item['icon'])
+        return paginator.get_paginated_response(results)
+
+class CategoryProductSearchView(APIView):
+    """Search categories and products together"""
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchResultsSetPagination
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('q', str, description='Search query'),
+            OpenApiParameter('limit', int, description='Number of results to return'),
+            OpenApiParameter('offset', int, description='Index of the first result'),
+        ],
+        responses={200: OpenApiResponse(description='Paginated typed search results')},
+        summary='Search categories and products',
+        description='Get matching categories followed by matching products in relevance order'
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        paginator = self.pagination_class()
+        results = paginator.paginate_results(
+            request, lambda limit, offset: search_catalog(query, limit, offset)
+        )
+        for item in results:
+            item['icon'] = build_media_url(request, item['icon'])
+        return paginator.get_paginated_response(results)
+
+class PopularSearchListView(APIView):
+    """Most searched categories"""
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchResultsSetPagination
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('limit', int, description='Number of results to return'),
+            OpenApiParameter('offset', int, description='Index of the first result'),
+        ],
+        responses={200: OpenApiResponse(description='Paginated popular search terms')},
+        summary='Popular searches',
+        description='Get the most searched categories with their search counts'
+    )
+    def get(self, request):
+        top = get_top()
+        paginator = self.pagination_class()
+        results = paginator.paginate_results(
+            request, lambda limit, offset: (len(top), top[offset:offset + limit])
+        )
+        return paginator.get_paginated_response([
+            {
+                'id': entry['id'],
+                'name': f"{entry['name_uz']} / {entry['name_ru']}",
+                'icon': build_media_url(request, entry['icon']),
+                'search_count': entry['search_count'],
+            }
+            for entry in results
+        ])
+
+class SearchCountIncreaseView(APIView):
+    """Count a search in a category"""
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        responses={
+            200: PopularSearchSerializer,
+            404: OpenApiResponse(description='Category not found')
+        },
+        summary='Increase category search count',
+        description='Register one search in the category (id is the category id)'
+    )
+    def get(self, request, id):
+        category = get_object_or_404(Category, id=id, is_active=True)
+        popular_search = increment_search_count(category)
+        return Response(PopularSearchSerializer(popular_search).data)
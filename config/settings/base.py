@@ -141,7 +141,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -158,8 +158,7 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
-        'apps.common.throttling.AuthenticatedUserThrottle',
-        'apps.common.throttling.AnonymousUserThrottle',
+        'apps.common.throttling.RateLimitThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'authenticated_user': '1000/hour',
@@ -169,6 +168,25 @@ REST_FRAMEWORK = {
     }
 }
 
+# Rate limiting: counters live in RATE_LIMIT_CACHE, which must be shared by
+# all workers in production. Requests to the URL names below cost more units.
+RATE_LIMIT_BACKEND = 'apps.common.ratelimit.CacheBackend'
+RATE_LIMIT_CACHE = 'default'
+RATE_LIMIT_COSTS = {
+    'accounts:login': 5,
+    'accounts:register': 10,
+    'accounts:seller_register': 10,
+    'accounts:token_refresh': 2,
+    'store:ads_create': 5,
+    'store:ads_bulk_create': 50,
+}
+
+# Password hashing pool: hashes running at once and waiting per process;
+# past that, login and registration answer 503 at once
+PASSWORD_HASHING_WORKERS = 4
+PASSWORD_HASHING_QUEUE = 16
+PASSWORD_HASHING_TIMEOUT = 10
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -185,6 +203,9 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Revoked on logout and rotation, see apps.accounts.revocation
+    'AUTH_TOKEN_CLASSES': ('apps.accounts.tokens.RevocableAccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.serializers.RevocableTokenRefreshSerializer',
 }
 
 # CORS settings
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -213,3 +213,342 @@ class AdminUserManagementTest(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(User.objects.filter(id=user_to_delete.id).exists())
+
+class CachedJWTAuthenticationTest(APITestCase):
+    """Test JWT users are resolved from the cached snapshot"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework_simplejwt.tokens import AccessToken
+        
+        cache.clear()
+        self.user = SellerUserFactory(address=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('store:my_ads')
+    
+    def user_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [q['sql'] for q in queries if 'FROM "accounts_user"' in q['sql']]
+    
+    def test_warm_request_skips_users_query(self):
+        """Test only the first request loads the user row"""
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+    
+    def test_changes_invalidate_snapshot(self):
+        """Test saves and bulk admin updates are seen on the next request"""
+        from django.contrib.admin.sites import site
+        
+        self.user_queries()
+        self.user.role = 'user'
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        admin = site._registry[User]
+        admin.message_user = lambda *args, **kwargs: None
+        admin.deactivate_users(None, User.objects.filter(pk=self.user.pk))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_snapshots_expire_without_invalidation(self):
+        """Test changes made elsewhere are seen once the snapshot times out"""
+        from unittest import mock
+        from apps.accounts import authentication
+        
+        with mock.patch.object(authentication, 'SNAPSHOT_TIMEOUT', 0):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+            # update() skips the signals, as a save in another process would here
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_deferred_fields_load_together(self):
+        """Test a snapshot user reads its other fields in one query"""
+        from apps.accounts.authentication import build_user, load_snapshot
+        
+        user = build_user(load_snapshot(self.user.pk))
+        self.assertTrue(user.is_seller)
+        with self.assertNumQueries(1):
+            self.assertEqual((user.full_name, user.phone_number), (self.user.full_name, self.user.phone_number))
+
+@override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE=0)
+class PasswordHashingPoolTest(APITestCase):
+    """Test login and registration hash on the bounded pool"""
+    
+    def setUp(self):
+        self.user = UserFactory(address=None, phone_number='+998901112233')
+        self.user.set_password('testpass123')
+        self.user.save()
+        self.url = reverse('accounts:login')
+    
+    def test_login_hashes_on_pool(self):
+        """Test credentials are still checked through the pool"""
+        response = self.client.post(self.url, {'phone_number': '+998901112233', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.url, {'phone_number': '+998901112233', 'password': 'wrongpass'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_saturated_pool_rejects_fast(self):
+        """Test a full pool answers 503 instead of queueing the request"""
+        import threading
+        from apps.accounts.hashing import get_pool
+        
+        release = threading.Event()
+        started = threading.Event()
+        
+        def hold():
+            started.set()
+            release.wait(5)
+        
+        holder = threading.Thread(target=get_pool().run, args=(hold,))
+        holder.start()
+        started.wait(5)
+        try:
+            response = self.client.post(self.url, {'phone_number': '+998901112233', 'password': 'testpass123'})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '1')
+            
+            response = self.client.post(reverse('accounts:register'), {
+                'phone_number': '+998901112244',
+                'password': 'testpass123',
+                'password_confirm': 'testpass123'
+            })
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertFalse(User.objects.filter(phone_number='+998901112244').exists())
+        finally:
+            release.set()
+            holder.join()
+
+class TokenRevocationTest(APITestCase):
+    """Test logout and rotation revoke tokens"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        
+        cache.clear()
+        self.user = UserFactory(address=None, phone_number='+998901113344')
+        self.user.set_password('testpass123')
+        self.user.save()
+        response = self.client.post(reverse('accounts:login'), {
+            'phone_number': '+998901113344', 'password': 'testpass123'
+        })
+        self.access = response.data['access_token']
+        self.refresh = response.data['refresh_token']
+    
+    def refresh_token(self, token):
+        return self.client.post(reverse('accounts:token_refresh'), {'refresh': token})
+    
+    def test_rotation_revokes_old_refresh_token(self):
+        """Test a rotated refresh token cannot be used again"""
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh_token(response.data['refresh']).status_code, status.HTTP_200_OK)
+    
+    def test_logout_revokes_both_tokens(self):
+        """Test logout rejects the access and refresh token afterwards"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        response = self.client.post(reverse('accounts:logout'), {'refresh_token': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(self.client.get(reverse('accounts:profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_unrevoked_tokens_skip_the_table(self):
+        """Test the Bloom filter answers for tokens that were never revoked"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.accounts.revocation import revocations
+        
+        revocations.sync(force=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_200_OK)
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT')]
+        self.assertFalse(any('accounts_revokedtoken' in sql for sql in selects))
+    
+    def test_prune_drops_expired_entries(self):
+        """Test expired entries are deleted and the filter rebuilt without them"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.accounts.models import RevokedToken
+        from apps.accounts.revocation import BloomFilter, revocations
+        
+        bloom = BloomFilter(1000)
+        bloom.add('revoked')
+        self.assertIn('revoked', bloom)
+        self.assertNotIn('other', bloom)
+        
+        # The first revocation of the interval prunes on its own
+        revocations.revoke('expired-jti', timezone.now() - timedelta(minutes=1))
+        self.assertFalse(RevokedToken.objects.exists())
+        
+        revocations.revoke('live-jti', timezone.now() + timedelta(days=1))
+        RevokedToken.objects.create(jti='expired-jti', expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(revocations.prune(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live-jti'])
+        revocations.sync(force=True)
+        self.assertFalse(revocations.is_revoked('expired-jti'))
+        self.assertTrue(revocations.is_revoked('live-jti'))
+    
+    def test_sync_reads_revocations_from_other_processes(self):
+        """Test rows written elsewhere reach the filter without the cache"""
+        from datetime import timedelta
+        from unittest import mock
+        from django.utils import timezone
+        from apps.accounts.models import RevokedToken
+        from apps.accounts import revocation
+        
+        store = revocation.RevocationStore()
+        store.sync(force=True)
+        expires_at = timezone.now() + timedelta(days=1)
+        RevokedToken.objects.create(jti='other-worker', expires_at=expires_at)
+        store.sync(force=True)
+        self.assertTrue(store.is_revoked('other-worker'))
+        
+        # Outgrowing the filter rebuilds it at a larger size
+        with mock.patch.object(revocation, 'MIN_CAPACITY', 2):
+            store.load()
+            RevokedToken.objects.bulk_create(
+                [RevokedToken(jti=f'bulk-{i}', expires_at=expires_at) for i in range(5)]
+            )
+            store.sync(force=True)
+        self.assertEqual(store._capacity, 12)
+        self.assertTrue(store.is_revoked('bulk-4'))
+
+class UserStatsTest(APITestCase):
+    """Test the dashboard statistics counters"""
+    
+    def setUp(self):
+        from apps.accounts.models import SellerProfile
+        
+        self.admin = AdminUserFactory(address=None)
+        self.seller = SellerUserFactory(address=None)
+        SellerProfile.objects.create(user=self.seller, project_name='Shop')
+        UserFactory(address=None, is_active=False)
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('accounts:user_stats')
+    
+    def get_stats(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_counters_follow_changes(self):
+        """Test counts are reconciled once, then kept by signals and read in one query"""
+        from apps.accounts.models import SellerProfile
+        from apps.accounts.stats import compute_counters
+        
+        stats = self.get_stats()
+        self.assertEqual(stats['total_users'], 3)
+        self.assertEqual(stats['active_users'], 2)
+        self.assertEqual(stats['users_by_role'], {'super_admin': 0, 'admin': 1, 'seller': 1, 'user': 1})
+        self.assertEqual((stats['pending_sellers'], stats['approved_sellers']), (1, 0))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            user = UserFactory(address=None)
+            user.role = 'seller'
+            user.save()
+            profile = SellerProfile.objects.get(user=self.seller)
+            profile.is_approved = True
+            profile.save()
+            self.seller.delete()
+        
+        with self.assertNumQueries(1):
+            stats = self.get_stats()
+        self.assertEqual(stats['total_users'], 3)
+        self.assertEqual(stats['users_by_role']['seller'], 1)
+        self.assertEqual((stats['pending_sellers'], stats['approved_sellers']), (0, 0))
+        counters = compute_counters()
+        self.assertEqual(stats['active_users'], counters['active_users'])
+    
+    def test_reconcile_command_fixes_drift(self):
+        """Test bulk updates are corrected by the reconciliation job"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self.get_stats()
+        User.objects.filter(is_active=False).update(is_active=True)
+        self.assertEqual(self.get_stats()['active_users'], 2)
+        call_command('reconcile_user_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats()['active_users'], 3)
+
+class AdminUserSearchTest(APITestCase):
+    """Test indexed phone and name search in the admin user list"""
+    
+    def setUp(self):
+        self.client.force_authenticate(AdminUserFactory(address=None, phone_number='+998711110000', full_name='Admin'))
+        self.alisher = UserFactory(address=None, phone_number='+998901234567', full_name='Alisher Navoiy')
+        self.dilnoza = UserFactory(address=None, phone_number='+998935554567', full_name='Dilnoza Karimova')
+        self.url = reverse('accounts:admin_users')
+    
+    def search(self, text):
+        response = self.client.get(self.url, {'search': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {user['id'] for user in response.data['results']}
+    
+    def test_phone_prefix_and_suffix(self):
+        """Test numbers match by their leading or trailing digits"""
+        self.assertEqual(self.search('+998 90'), {self.alisher.id})
+        self.assertEqual(self.search('4567'), {self.alisher.id, self.dilnoza.id})
+        self.assertEqual(self.search('5554567'), {self.dilnoza.id})
+        self.assertEqual(self.search('1234'), set())
+    
+    def test_name_trigrams(self):
+        """Test names match on substrings of every term, ignoring case"""
+        self.assertEqual(self.search('sher'), {self.alisher.id})
+        self.assertEqual(self.search('KARIM dil'), {self.dilnoza.id})
+        self.assertEqual(self.search('ova'), {self.dilnoza.id})
+        # Shorter than a trigram: still matched, without the index
+        self.assertEqual(self.search('al'), {self.alisher.id})
+        self.assertEqual(self.search('dil ka'), {self.dilnoza.id})
+        self.assertEqual(self.search('al ka'), set())
+        
+        self.alisher.full_name = 'Bobur Mirzo'
+        self.alisher.save()
+        self.assertEqual(self.search('sher'), set())
+        self.assertEqual(self.search('mirz'), {self.alisher.id})
+
+class AdminUserExportTest(APITestCase):
+    """Test streamed exports of users"""
+    
+    def setUp(self):
+        from apps.accounts.models import SellerProfile
+        
+        self.client.force_authenticate(AdminUserFactory(address=None))
+        self.seller = SellerUserFactory(address=None)
+        SellerProfile.objects.create(user=self.seller, project_name='Export Shop', is_approved=True)
+        UserFactory(address=None, is_active=False)
+        self.url = reverse('accounts:admin_users_export')
+    
+    def test_filtered_csv(self):
+        """Test filters match the admin user list and seller profiles are joined"""
+        import csv
+        import io
+        
+        response = self.client.get(self.url, {'role': 'seller'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('attachment; filename="users.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([int(row['id']) for row in rows], [self.seller.id])
+        self.assertEqual(rows[0]['seller_project_name'], 'Export Shop')
+        self.assertEqual(rows[0]['seller_is_approved'], 'True')
+    
+    def test_command_writes_ndjson(self):
+        """Test the management command streams the same rows"""
+        import io
+        import json
+        from django.core.management import call_command
+        
+        out = io.StringIO()
+        call_command('export_users', '--format', 'ndjson', '--filter', 'is_active=false', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertFalse(rows[0]['is_active'])
@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -51,6 +51,58 @@ class RateLimitTest(APITestCase):
             response = self.client.get(url)
             self.assertNotEqual(response.status_code, 429)
 
+@override_settings(RATE_LIMIT_BACKEND='apps.common.ratelimit.LocalBackend')
+class SlidingWindowRateLimitTest(APITestCase):
+    """Test the sliding window limiter behind the middleware and throttle"""
+    
+    def setUp(self):
+        from apps.common.ratelimit import get_backend
+        
+        self.backend = get_backend()
+        self.backend.reset()
+    
+    def test_window_slides(self):
+        """Test the previous window keeps counting while it overlaps"""
+        from apps.common.ratelimit import hit
+        
+        for _ in range(3):
+            self.assertTrue(hit('test', '3/m', now=30)[0])
+        allowed, retry_after = hit('test', '3/m', now=59)
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 1)
+        
+        # Half of the previous window still overlaps: 1.5 + 1 <= 3
+        self.assertTrue(hit('test', '3/m', now=90)[0])
+        self.assertFalse(hit('test', '3/m', now=90)[0])
+        self.assertTrue(hit('test', '3/m', now=119)[0])
+    
+    def test_concurrent_hits_are_not_lost(self):
+        """Test the cache backend admits exactly the limit under contention"""
+        from concurrent.futures import ThreadPoolExecutor
+        from apps.common.ratelimit import hit
+        
+        cache.clear()
+        with override_settings(RATE_LIMIT_BACKEND='apps.common.ratelimit.CacheBackend'):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: hit('concurrent', '20/h', now=100)[0], range(50)))
+        self.assertEqual(results.count(True), 20)
+    
+    @override_settings(RATE_LIMIT_COSTS={'accounts:login': 40})
+    def test_route_cost_charged_once(self):
+        """Test weighted routes and that DRF views are charged only by the throttle"""
+        url = reverse('accounts:login')
+        data = {'phone_number': '+998901234567', 'password': 'wrong'}
+        
+        for _ in range(2):
+            self.assertNotEqual(self.client.post(url, data).status_code, 429)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        
+        # Authenticated users have their own budget
+        self.client.force_authenticate(user=UserFactory(address=None))
+        self.assertEqual(self.client.get(reverse('accounts:profile')).status_code, status.HTTP_200_OK)
+
 class InputValidationTest(APITestCase):
     """Test input validation and sanitization"""
     
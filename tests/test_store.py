@@ -1,12 +1,19 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from .factories import (
-    UserFactory, SellerUserFactory, CategoryFactory, 
+    UserFactory, SellerUserFactory, AdminUserFactory, CategoryFactory, 
     AdFactory, AdPhotoFactory
 )
-from apps.store.models import Ad, AdLike
+from apps.store.autocomplete import autocomplete_index
+from apps.store.models import Ad, AdLike, AdPhoto, PopularSearch, view_counter
+from apps.store.popular import get_top, search_counter
+from apps.store.tracking import view_log
 
 class CategoryModelTest(TestCase):
     """Test Category model"""
@@ -23,6 +30,7 @@ class CategoryModelTest(TestCase):
         self.assertEqual(child.parent, parent)
         self.assertIn(child, parent.children.all())
 
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
 class AdModelTest(TestCase):
     """Test Ad model"""
     
@@ -38,6 +46,9 @@ class AdModelTest(TestCase):
         ad.increment_view_count()
         
         self.assertEqual(ad.view_count, initial_count + 1)
+        view_counter.flush()
+        ad.refresh_from_db()
+        self.assertEqual(ad.view_count, initial_count + 1)
 
 class CategoryAPITest(APITestCase):
     """Test category endpoints"""
@@ -63,6 +74,7 @@ class CategoryAPITest(APITestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(len(response.data[0]['children']), 1)
 
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
 class AdAPITest(APITestCase):
     """Test advertisement endpoints"""
     
@@ -181,10 +193,12 @@ class AdAPITest(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        # Check view count increased
+        # Check view count increased once buffered views are flushed
+        view_counter.flush()
         self.ad.refresh_from_db()
         self.assertEqual(self.ad.view_count, initial_count + 1)
 
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
 class AdPermissionTest(APITestCase):
     """Test ad permissions and security"""
     
@@ -218,3 +232,1095 @@ class AdPermissionTest(APITestCase):
         data = {'name_uz': 'Test Ad'}
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class AdCursorPaginationTest(APITestCase):
+    """Test keyset pagination mode on ad lists"""
+    
+    def setUp(self):
+        self.seller = SellerUserFactory(address=None)
+        self.category = CategoryFactory(slug='cursor-category')
+        prices = [300, 100, 200, 100, 300, 100]
+        self.ads = [
+            AdFactory(seller=self.seller, category=self.category, price=price, slug=f'cursor-ad-{i}')
+            for i, price in enumerate(prices)
+        ]
+    
+    def walk(self, params):
+        url = reverse('store:ads_list')
+        response = self.client.get(url, dict(params, cursor=''))
+        ids = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+    
+    def test_cursor_walk_matches_ordering(self):
+        """Test walking all cursor pages returns every ad once, in order"""
+        ids = self.walk({'ordering': 'price', 'page_size': 2})
+        expected = [
+            ad.id for ad in sorted(self.ads, key=lambda ad: (ad.price, ad.id))
+        ]
+        self.assertEqual(ids, expected)
+        
+        ids = self.walk({'ordering': '-published_at', 'page_size': 4})
+        expected = list(
+            Ad.objects.order_by('-published_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+    
+    def test_cursor_needs_ordering_for_ranked_search(self):
+        """Test relevance-ordered search pages by offset only, explicit orderings by cursor"""
+        from apps.store.search import is_supported
+        
+        if not is_supported():
+            self.skipTest('No full-text index on this backend')
+        url = reverse('store:ads_list')
+        self.assertEqual(self.client.get(url, {'search': 'ad'}).status_code, status.HTTP_200_OK)
+        response = self.client.get(url, {'search': 'ad', 'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', response.data)
+        
+        response = self.client.get(url, {'search': 'ad', 'cursor': '', 'ordering': '-published_at'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_page_number_mode_unchanged(self):
+        """Test responses without a cursor keep the count field"""
+        response = self.client.get(reverse('store:ads_list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], len(self.ads))
+    
+    def test_invalid_cursor(self):
+        """Test garbage or mismatched cursors are rejected"""
+        import base64
+        import json
+        
+        url = reverse('store:ads_list')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        response = self.client.get(url, {'cursor': '', 'ordering': 'price', 'page_size': 2})
+        token = response.data['next'].split('cursor=')[1].split('&')[0]
+        response = self.client.get(url, {'cursor': token, 'ordering': 'view_count'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        # Well-formed tokens with a null value or pk
+        for payload in (
+            {'o': '-published_at', 'v': None, 'pk': 1},
+            {'o': '-published_at', 'v': '2024-01-01T00:00:00Z', 'pk': None},
+        ):
+            token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+            response = self.client.get(url, {'cursor': token})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class AdListIsLikedTest(APITestCase):
+    """Test is_liked is resolved once per page"""
+    
+    def setUp(self):
+        self.user = UserFactory(address=None)
+        seller = SellerUserFactory(address=None)
+        category = CategoryFactory(slug='liked-category')
+        self.ads = [
+            AdFactory(seller=seller, category=category, slug=f'liked-ad-{i}')
+            for i in range(6)
+        ]
+        AdLike.objects.create(user=self.user, ad=self.ads[0])
+        AdLike.objects.create(user=self.user, ad=self.ads[3])
+    
+    def test_is_liked_single_query(self):
+        """Test liked flags are correct and cost one query per page"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('store:ads_list')
+        
+        for page_size in (2, 6):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {'page_size': page_size})
+            like_queries = [
+                query for query in context.captured_queries
+                if 'store_adlike' in query['sql']
+            ]
+            self.assertEqual(len(like_queries), 1)
+        
+        liked = {item['id'] for item in response.data['results'] if item['is_liked']}
+        self.assertEqual(liked, {self.ads[0].id, self.ads[3].id})
+
+class AdListPhotosTest(APITestCase):
+    """Test list photos are limited and prefetched in one query"""
+    
+    def setUp(self):
+        seller = SellerUserFactory(address=None)
+        category = CategoryFactory(slug='photos-category')
+        self.ads = []
+        for i, photo_count in enumerate([1, 5, 20]):
+            ad = AdFactory(seller=seller, category=category, slug=f'photos-ad-{i}')
+            AdPhoto.objects.bulk_create([
+                AdPhoto(ad=ad, image=f'ads/{ad.slug}-{n}.jpg', order=photo_count - n)
+                for n in range(photo_count)
+            ])
+            self.ads.append(ad)
+    
+    def test_list_photos_limited_and_ordered(self):
+        """Test at most three photos per ad, lowest order first, one photo query"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('store:ads_list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        photo_queries = [
+            query for query in context.captured_queries
+            if 'store_adphoto' in query['sql']
+        ]
+        self.assertEqual(len(photo_queries), 1)
+        
+        photos = {item['id']: item['photos'] for item in response.data['results']}
+        self.assertEqual(len(photos[self.ads[0].id]), 1)
+        self.assertEqual(len(photos[self.ads[1].id]), 3)
+        self.assertEqual(
+            photos[self.ads[2].id],
+            [f'/media/ads/{self.ads[2].slug}-{n}.jpg' for n in (19, 18, 17)]
+        )
+
+class AdFullTextSearchTest(APITestCase):
+    """Test full-text search on the ads list"""
+    
+    def setUp(self):
+        self.seller = SellerUserFactory(address=None)
+        self.other_seller = SellerUserFactory(address=None)
+        self.category = CategoryFactory(slug='search-category')
+        self.phone = AdFactory(
+            seller=self.seller, category=self.category, slug='search-phone',
+            name_uz='Samsung Galaxy telefon', name_ru='Телефон Самсунг Галакси',
+            description_uz='Yangi holatda', description_ru='Новый', price=500
+        )
+        self.laptop = AdFactory(
+            seller=self.other_seller, category=self.category, slug='search-laptop',
+            name_uz='Noutbuk Lenovo', name_ru='Ноутбук Леново',
+            description_uz='Samsung monitor bilan', description_ru='С монитором', price=900
+        )
+    
+    def search(self, **params):
+        response = self.client.get(reverse('store:ads_list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+    
+    def test_search_ranks_name_matches_first(self):
+        """Test both languages match and name hits outrank description hits"""
+        self.assertEqual(self.search(search='samsung'), [self.phone.id, self.laptop.id])
+        self.assertEqual(self.search(search='ноутб'), [self.laptop.id])
+        self.assertEqual(self.search(search='телефон самсунг'), [self.phone.id])
+        self.assertEqual(self.search(search='"); DROP TABLE --'), [])
+    
+    def test_search_composes_with_filters(self):
+        """Test search combines with AdFilter and explicit ordering"""
+        self.assertEqual(self.search(search='samsung', min_price=600), [self.laptop.id])
+        self.assertEqual(self.search(search='samsung', seller=self.seller.id), [self.phone.id])
+        self.assertEqual(
+            self.search(search='samsung', ordering='-price'),
+            [self.laptop.id, self.phone.id]
+        )
+    
+    def test_index_follows_updates(self):
+        """Test edited and deleted ads are reindexed"""
+        self.laptop.name_uz = 'Planshet Apple'
+        self.laptop.description_uz = 'Oddiy'
+        self.laptop.save()
+        self.assertEqual(self.search(search='samsung'), [self.phone.id])
+        self.assertEqual(self.search(search='planshet'), [self.laptop.id])
+        
+        self.phone.delete()
+        self.assertEqual(self.search(search='samsung'), [])
+    
+    def test_fallback_on_other_backends(self):
+        """Test backends without a full-text index match substrings of every term"""
+        from types import SimpleNamespace
+        from apps.store.search import search_ads
+        
+        queryset = search_ads(Ad.objects.all(), 'SAMSUNG monitor', conn=SimpleNamespace(vendor='mysql'))
+        self.assertEqual([(ad.id, ad.search_rank) for ad in queryset], [(self.laptop.id, 0.0)])
+
+class SearchCompleteTest(APITestCase):
+    """Test the in-memory autocomplete index and endpoint"""
+    
+    def setUp(self):
+        autocomplete_index.clear()
+        self.addCleanup(autocomplete_index.clear)
+        self.seller = SellerUserFactory(address=None)
+        self.category = CategoryFactory(
+            slug='complete-phones', name_uz='Telefonlar', name_ru='Телефоны'
+        )
+        self.iphone_13 = AdFactory(
+            seller=self.seller, category=self.category, slug='complete-iphone-13',
+            name_uz='iPhone 13', name_ru='Айфон 13', view_count=5
+        )
+        self.iphone_15 = AdFactory(
+            seller=self.seller, category=self.category, slug='complete-iphone-15',
+            name_uz='iPhone 15 Pro Max', name_ru='Айфон 15 Про Макс', view_count=50
+        )
+    
+    def complete(self, text, **kwargs):
+        count, results = autocomplete_index.complete(text, language='uz', **kwargs)
+        return count, [(item['type'], item['id']) for item in results]
+    
+    def test_prefix_ranked_by_popularity_without_queries(self):
+        """Test matches on any word start, most viewed first, served from memory"""
+        autocomplete_index.build()
+        with self.assertNumQueries(0):
+            count, results = self.complete('IPH')
+        self.assertEqual(count, 2)
+        self.assertEqual(results, [('product', self.iphone_15.id), ('product', self.iphone_13.id)])
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('про м')[1], [('product', self.iphone_15.id)])
+            self.assertEqual(self.complete('telef')[1], [('category', self.category.id)])
+            self.assertEqual(self.complete('iphone', limit=1, offset=1)[1], [('product', self.iphone_13.id)])
+    
+    def test_incremental_updates(self):
+        """Test new ads are added and deactivated ads dropped without a rebuild"""
+        autocomplete_index.build()
+        new_ad = AdFactory(
+            seller=self.seller, category=self.category, slug='complete-iphone-16',
+            name_uz='iPhone 16', name_ru='Айфон 16', view_count=500
+        )
+        self.assertEqual(self.complete('iphone')[1][0], ('product', new_ad.id))
+        
+        self.iphone_15.is_active = False
+        self.iphone_15.save()
+        self.assertEqual(
+            self.complete('iphone')[1],
+            [('product', new_ad.id), ('product', self.iphone_13.id)]
+        )
+    
+    def test_admin_bulk_actions_update_index(self):
+        """Test admin activation and deactivation, which send no post_save, reach the index"""
+        from django.contrib.admin.sites import site
+        from apps.store.models import Category
+        
+        autocomplete_index.build()
+        ad_admin = site._registry[Ad]
+        category_admin = site._registry[Category]
+        for model_admin in (ad_admin, category_admin):
+            model_admin.message_user = lambda *args, **kwargs: None
+        
+        ad_admin.deactivate_ads(None, Ad.objects.filter(id=self.iphone_15.id))
+        category_admin.deactivate_categories(None, Category.objects.filter(id=self.category.id))
+        self.assertEqual(self.complete('iphone')[1], [('product', self.iphone_13.id)])
+        self.assertEqual(self.complete('telef'), (0, []))
+        
+        ad_admin.activate_ads(None, Ad.objects.filter(id=self.iphone_15.id))
+        category_admin.activate_categories(None, Category.objects.filter(id=self.category.id))
+        self.assertEqual(self.complete('iphone')[1][0], ('product', self.iphone_15.id))
+        self.assertEqual(self.complete('telef')[1], [('category', self.category.id)])
+    
+    def test_updates_during_build_are_kept(self):
+        """Test changes made while the rows load are replayed onto the new index"""
+        from unittest import mock
+        
+        load = autocomplete_index._load
+        created = []
+        
+        def load_then_write():
+            entries = load()
+            created.append(AdFactory(
+                seller=self.seller, category=self.category, slug='complete-iphone-17',
+                name_uz='iPhone 17', name_ru='Айфон 17'
+            ))
+            self.iphone_13.delete()
+            return entries
+        
+        with mock.patch.object(autocomplete_index, '_load', load_then_write):
+            autocomplete_index.build()
+        self.assertEqual(
+            self.complete('iphone')[1],
+            [('product', self.iphone_15.id), ('product', created[0].id)]
+        )
+    
+    def test_complete_endpoint(self):
+        """Test the paginated endpoint and language-specific names"""
+        url = reverse('store:search_complete')
+        response = self.client.get(url, {'q': 'айф', 'limit': 1}, HTTP_ACCEPT_LANGUAGE='ru')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['results'][0]['name'], 'Айфон 15 Про Макс')
+        
+        response = self.client.get(url, {'q': ''})
+        self.assertEqual(response.data['count'], 0)
+
+class PopularSearchTest(APITestCase):
+    """Test buffered category search counters"""
+    
+    def setUp(self):
+        cache.clear()
+        search_counter.flush()
+        self.addCleanup(search_counter.flush)
+        self.phones = CategoryFactory(slug='popular-phones', name_uz='Telefon', name_ru='Телефон')
+        self.laptops = CategoryFactory(slug='popular-laptops', name_uz='Noutbuk', name_ru='Ноутбук')
+    
+    def increase(self, category):
+        url = reverse('store:search_count_increase', kwargs={'id': category.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_increments_are_buffered(self):
+        """Test hits are not written until a flush, then applied with one update"""
+        for expected in (1, 2, 3):
+            self.assertEqual(self.increase(self.phones)['search_count'], expected)
+        self.assertEqual(PopularSearch.objects.get(category=self.phones).search_count, 0)
+        
+        self.assertEqual(search_counter.flush(), {self.phones.id: 3})
+        self.assertEqual(PopularSearch.objects.get(category=self.phones).search_count, 3)
+        self.assertEqual(self.increase(self.phones)['search_count'], 4)
+    
+    def test_populars_follow_flushes(self):
+        """Test the cached top list is merged on flush and served without counting rows"""
+        self.increase(self.phones)
+        search_counter.flush()
+        self.assertEqual([entry['category'] for entry in get_top()], [self.phones.id])
+        
+        for _ in range(2):
+            self.increase(self.laptops)
+        search_counter.flush()
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('store:search_populars'), {'limit': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['name'], 'Noutbuk / Ноутбук')
+        self.assertEqual(response.data['results'][0]['search_count'], 2)
+    
+    def test_unknown_category(self):
+        url = reverse('store:search_count_increase', kwargs={'id': 999999})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+class CategoryProductSearchTest(APITestCase):
+    """Test the unified category and product search"""
+    
+    def setUp(self):
+        autocomplete_index.clear()
+        self.addCleanup(autocomplete_index.clear)
+        seller = SellerUserFactory(address=None)
+        self.phones = CategoryFactory(slug='unified-phones', name_uz='Telefonlar', name_ru='Телефоны')
+        self.cases = CategoryFactory(slug='unified-cases', name_uz='Telefon gʻiloflari', name_ru='Чехлы')
+        self.ads = [
+            AdFactory(
+                seller=seller, category=self.phones, slug=f'unified-ad-{i}',
+                name_uz=f'Telefon model {i}', name_ru=f'Телефон модель {i}',
+                description_uz='Tavsif', description_ru='Описание'
+            )
+            for i in range(3)
+        ]
+    
+    def search(self, **params):
+        response = self.client.get(reverse('store:search_category_product'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_categories_then_products(self):
+        """Test the stream is typed, categories first, and windows split across sources"""
+        data = self.search(q='telefon', limit=3)
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([item['type'] for item in data['results']], ['category', 'category', 'product'])
+        self.assertEqual(data['results'][0]['name'].split(' / ')[1][:4], 'Теле')
+        
+        data = self.search(q='telefon', limit=3, offset=3)
+        self.assertEqual([item['type'] for item in data['results']], ['product', 'product'])
+        self.assertIsNone(data['next'])
+        
+        first_page = self.search(q='telefon', limit=3)['results'][2:]
+        second_page = self.search(q='telefon', limit=3, offset=3)['results']
+        product_ids = {item['id'] for item in first_page + second_page}
+        self.assertEqual(product_ids, {ad.id for ad in self.ads})
+    
+    def test_category_side_served_from_memory(self):
+        """Test matching categories come from the index, not per-request queries"""
+        autocomplete_index.build()
+        with CaptureQueriesContext(connection) as context:
+            self.search(q='чехл')
+        self.assertFalse(any(
+            'FROM "store_category"' in query['sql'] for query in context.captured_queries
+        ))
+
+    def test_category_lookup_follows_updates(self):
+        """Test every word must start a category word, and deactivated categories drop out"""
+        autocomplete_index.build()
+        self.assertEqual(
+            [suggestion.id for suggestion in autocomplete_index.match_categories(['tel', 'g'])],
+            [self.cases.id]
+        )
+        self.assertEqual(autocomplete_index.match_categories(['model']), [])
+        
+        self.cases.is_active = False
+        self.cases.save()
+        self.assertEqual(
+            [suggestion.id for suggestion in autocomplete_index.match_categories(['tel'])],
+            [self.phones.id]
+        )
+
+class CategoryTreeCacheTest(APITestCase):
+    """Test the cached category tree and breadcrumbs"""
+    
+    def setUp(self):
+        cache.clear()
+        self.root = CategoryFactory(slug='tree-root', name_uz='Elektronika', name_ru='Электроника')
+        self.phones = CategoryFactory(slug='tree-phones', parent=self.root, name_uz='Telefonlar')
+        self.smart = CategoryFactory(slug='tree-smart', parent=self.phones, name_uz='Smartfonlar')
+        self.hidden = CategoryFactory(slug='tree-hidden', parent=self.root, is_active=False)
+        self.url = reverse('store:categories_with_childs')
+    
+    def get_tree(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+    
+    def test_tree_cached_after_first_request(self):
+        """Test nested active children and no queries once cached"""
+        tree = self.get_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_tree(), tree)
+        
+        self.assertEqual(len(tree), 1)
+        self.assertEqual([child['id'] for child in tree[0]['children']], [self.phones.id])
+        self.assertEqual(tree[0]['children'][0]['children'][0]['name'], 'Smartfonlar')
+    
+    def test_tree_invalidated_on_changes(self):
+        """Test saves and admin bulk actions drop the cached tree"""
+        from django.contrib.admin.sites import site
+        from apps.store.admin import CategoryAdmin
+        from apps.store.models import Category
+        
+        self.get_tree()
+        self.smart.name_uz = 'Aqlli telefonlar'
+        self.smart.save()
+        self.assertEqual(self.get_tree()[0]['children'][0]['children'][0]['name'], 'Aqlli telefonlar')
+        
+        category_admin = CategoryAdmin(Category, site)
+        category_admin.message_user = lambda *args, **kwargs: None
+        category_admin.activate_categories(None, Category.objects.filter(id=self.hidden.id))
+        self.assertEqual(len(self.get_tree()[0]['children']), 2)
+    
+    def test_tree_expires_without_invalidation(self):
+        """Test changes made elsewhere are seen once the cached tree times out"""
+        from unittest import mock
+        from apps.store import category_tree
+        from apps.store.models import Category
+        
+        with mock.patch.object(category_tree, 'CACHE_TIMEOUT', 0):
+            category_tree.get_category_tree()
+            # update() skips the signals, as a save in another process would here
+            Category.objects.filter(id=self.phones.id).update(is_active=False)
+            self.assertEqual(category_tree.get_category_tree()[0]['children'], [])
+    
+    def test_breadcrumbs_without_queries(self):
+        """Test an ad's breadcrumbs come from the cached node map"""
+        from apps.store.category_tree import get_breadcrumbs
+        
+        get_breadcrumbs(self.smart.id)
+        with self.assertNumQueries(0):
+            crumbs = get_breadcrumbs(self.smart.id, language='uz')
+        self.assertEqual([crumb['id'] for crumb in crumbs], [self.root.id, self.phones.id, self.smart.id])
+
+class CategoryPathTest(TestCase):
+    """Test the materialized category path"""
+    
+    def setUp(self):
+        self.root = CategoryFactory(slug='path-root')
+        self.phones = CategoryFactory(slug='path-phones', parent=self.root)
+        self.smart = CategoryFactory(slug='path-smart', parent=self.phones)
+        self.other = CategoryFactory(slug='path-other')
+    
+    def test_descendants_and_ancestors_in_one_query(self):
+        """Test subtree and ancestor lookups each take a single query"""
+        with self.assertNumQueries(1):
+            children = self.root.get_all_children()
+        self.assertEqual(children, [self.phones, self.smart])
+        
+        with self.assertNumQueries(1):
+            ancestors = self.smart.get_ancestors()
+        self.assertEqual(ancestors, [self.root, self.phones])
+        self.assertEqual(self.smart.path, f'/{self.root.id}/{self.phones.id}/{self.smart.id}/')
+    
+    def test_move_rewrites_subtree(self):
+        """Test moving a category updates the paths of its descendants"""
+        from apps.store.models import Category
+        
+        self.phones.parent = self.other
+        self.phones.save()
+        
+        self.smart.refresh_from_db()
+        self.assertEqual(self.smart.path, f'/{self.other.id}/{self.phones.id}/{self.smart.id}/')
+        self.assertEqual(self.root.get_all_children(), [])
+        self.assertEqual(self.other.get_all_children(), [self.phones, self.smart])
+        
+        self.root.parent = Category.objects.get(pk=self.smart.pk)
+        self.root.save()
+        self.phones.parent = self.smart
+        with self.assertRaises(ValidationError) as context:
+            self.phones.full_clean()
+        self.assertIn('parent', context.exception.message_dict)
+        with self.assertRaises(ValueError):
+            self.phones.save()
+        self.assertEqual(Category.objects.get(pk=self.phones.pk).parent_id, self.other.id)
+
+class AdCategoryFilterTest(APITestCase):
+    """Test category filters cover whole subtrees"""
+    
+    def setUp(self):
+        seller = SellerUserFactory(address=None)
+        self.root = CategoryFactory(slug='filter-root')
+        self.phones = CategoryFactory(slug='filter-phones', parent=self.root)
+        self.smart = CategoryFactory(slug='filter-smart', parent=self.phones)
+        self.cars = CategoryFactory(slug='filter-cars')
+        self.books = CategoryFactory(slug='filter-books')
+        self.ads = {
+            category.slug: AdFactory(seller=seller, category=category, slug=f'ad-{category.slug}')
+            for category in (self.root, self.phones, self.smart, self.cars, self.books)
+        }
+        self.url = reverse('store:ads_list')
+    
+    def get_slugs(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {ad['slug'] for ad in response.data['results']}
+    
+    def test_category_includes_descendants(self):
+        """Test a root category matches ads anywhere below it"""
+        self.assertEqual(
+            self.get_slugs(category=self.root.id),
+            {'ad-filter-root', 'ad-filter-phones', 'ad-filter-smart'}
+        )
+        self.assertEqual(self.get_slugs(category=self.smart.id), {'ad-filter-smart'})
+    
+    def test_category_ids(self):
+        """Test several comma-separated categories with their subtrees"""
+        slugs = self.get_slugs(category_ids=f'{self.phones.id},{self.smart.id},{self.cars.id}')
+        self.assertEqual(slugs, {'ad-filter-phones', 'ad-filter-smart', 'ad-filter-cars'})
+        self.assertEqual(self.get_slugs(category_ids='999999'), set())
+
+class AdViewCounterTest(TransactionTestCase):
+    """Test view counts are written by the background flusher"""
+    
+    def test_views_flushed_off_request_thread(self):
+        import time
+        from apps.common.counters import BufferedCounter
+        
+        seller = SellerUserFactory(address=None)
+        category = CategoryFactory(slug='counter-category')
+        ads = [AdFactory(seller=seller, category=category, slug=f'counter-ad-{i}') for i in range(2)]
+        counter = BufferedCounter(
+            'store.Ad', 'view_count', flush_interval=3600, max_pending=2, background=True
+        )
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.incr(ads[0].id, 3), {})
+            counter.incr(ads[1].id)
+        
+        expected = {'counter-ad-0': 3, 'counter-ad-1': 1}
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            counts = dict(Ad.objects.values_list('slug', 'view_count'))
+            if counts == expected:
+                break
+            time.sleep(0.01)
+        self.assertEqual(counts, expected)
+
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
+class AdViewTrackingTest(APITestCase):
+    """Test cache-based view de-duplication"""
+    
+    def setUp(self):
+        cache.clear()
+        view_log.flush()
+        self.addCleanup(view_counter.flush)
+        self.ad = AdFactory(
+            seller=SellerUserFactory(address=None), category=CategoryFactory(slug='tracking-category'),
+            slug='tracking-ad'
+        )
+        self.url = reverse('store:ads_detail', kwargs={'slug': self.ad.slug})
+    
+    def test_repeat_views_deduplicated_without_adview_queries(self):
+        """Test one AdView per visitor and no AdView reads on detail requests"""
+        from apps.store.models import AdView
+        
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.1').status_code, 200)
+        self.assertFalse([q for q in queries if 'SELECT' in q['sql'] and 'store_adview' in q['sql']])
+        
+        self.client.force_authenticate(UserFactory(address=None))
+        self.client.get(self.url, REMOTE_ADDR='10.0.0.1')
+        self.client.force_authenticate(None)
+        self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.2, 10.0.0.1')
+        
+        view_log.flush()
+        self.assertEqual(
+            sorted((view.user_id is not None, view.ip_address) for view in AdView.objects.all()),
+            [(False, '10.0.0.1'), (False, '10.0.0.2'), (True, '10.0.0.1')]
+        )
+
+class AdViewRollupTest(APITestCase):
+    """Test the daily AdView rollup and retention"""
+    
+    def setUp(self):
+        from django.utils import timezone
+        
+        self.seller = SellerUserFactory(address=None)
+        self.ad = AdFactory(seller=self.seller, category=CategoryFactory(slug='rollup-category'), slug='rollup-ad')
+        self.viewer = UserFactory(address=None)
+        self.now = timezone.now()
+    
+    def add_view(self, days_ago=0, user=None, ip_address=None):
+        from datetime import timedelta
+        from apps.store.models import AdView
+        
+        view = AdView.objects.create(ad=self.ad, user=user, ip_address=ip_address)
+        AdView.objects.filter(pk=view.pk).update(created_at=self.now - timedelta(days=days_ago, hours=1))
+        return view
+    
+    def test_incremental_rollup_and_prune(self):
+        """Test only new rows are read and expired rows are deleted after rollup"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.store.models import AdView, AdViewDaily
+        from apps.store.rollup import prune_views, rollup_views
+        
+        self.add_view(days_ago=100, ip_address='10.0.0.1')
+        self.add_view(user=self.viewer, ip_address='10.0.0.1')
+        self.add_view(ip_address='10.0.0.1')
+        self.add_view(ip_address='10.0.0.1')
+        self.assertEqual(rollup_views(now=self.now), 4)
+        
+        self.add_view(ip_address='10.0.0.2')
+        self.assertEqual(rollup_views(now=self.now), 1)
+        self.assertEqual(rollup_views(now=self.now), 0)
+        
+        today = AdViewDaily.objects.get(ad=self.ad, day=timezone.localdate(self.now - timedelta(hours=1)))
+        self.assertEqual((today.views, today.unique_visitors), (4, 3))
+        self.assertEqual(AdViewDaily.objects.count(), 2)
+        
+        self.assertEqual(prune_views(days=90, batch_size=1, now=self.now), 1)
+        self.assertEqual(AdView.objects.count(), 4)
+        self.assertEqual(AdViewDaily.objects.count(), 2)
+    
+    def test_stats_endpoint(self):
+        """Test sellers read daily stats of their own ads from the rollup"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self.add_view(ip_address='10.0.0.1')
+        self.add_view(days_ago=1, ip_address='10.0.0.1')
+        call_command('rollup_ad_views', '--no-prune', stdout=StringIO())
+        
+        url = reverse('store:ads_stats', kwargs={'slug': self.ad.slug})
+        self.client.force_authenticate(self.seller)
+        response = self.client.get(url, {'days': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_views'], 2)
+        self.assertEqual(len(response.data['days']), 2)
+        
+        self.client.force_authenticate(SellerUserFactory(address=None))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+class TrendingAdsTest(APITestCase):
+    """Test the decayed trending ranking behind popular ads"""
+    
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.store.models import AdViewDaily
+        
+        seller = SellerUserFactory(address=None)
+        self.root = CategoryFactory(slug='trending-root')
+        self.phones = CategoryFactory(slug='trending-phones', parent=self.root)
+        self.cars = CategoryFactory(slug='trending-cars')
+        today = timezone.localdate()
+        old = timezone.now() - timedelta(days=60)
+        
+        self.veteran = AdFactory(seller=seller, category=self.phones, slug='trending-veteran', view_count=10000)
+        self.rising = AdFactory(seller=seller, category=self.phones, slug='trending-rising')
+        self.car = AdFactory(seller=seller, category=self.cars, slug='trending-car')
+        Ad.objects.filter(id__in=[self.veteran.id, self.rising.id, self.car.id]).update(published_at=old)
+        
+        AdViewDaily.objects.create(ad=self.veteran, day=today - timedelta(days=10), views=100)
+        AdViewDaily.objects.create(ad=self.rising, day=today, views=40)
+        AdViewDaily.objects.create(ad=self.car, day=today, views=10)
+        AdLike.objects.create(user=UserFactory(address=None), ad=self.car)
+        self.url = reverse('store:popular_ads')
+    
+    def get_ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [ad['id'] for ad in response.data['results']]
+    
+    def test_recent_activity_outranks_lifetime_views(self):
+        """Test rankings decay and are kept per category subtree"""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        self.assertEqual(self.get_ids()[0], self.veteran.id)
+        call_command('update_trending', stdout=StringIO())
+        
+        self.assertEqual(self.get_ids(), [self.rising.id, self.car.id, self.veteran.id])
+        self.assertEqual(self.get_ids(category=self.root.id), [self.rising.id, self.veteran.id])
+        self.assertEqual(self.get_ids(category=self.cars.id), [self.car.id])
+        
+        # Page count, ads, photos
+        with self.assertNumQueries(3):
+            self.get_ids(category=self.phones.id)
+    
+    def test_unranked_ads_left_out(self):
+        """Test active ads without a ranking neither lead nor join the list"""
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.store.models import TrendingAd
+        
+        call_command('update_trending', stdout=StringIO())
+        TrendingAd.objects.filter(ad=self.veteran).delete()
+        self.assertEqual(self.get_ids(), [self.rising.id, self.car.id])
+        
+        # No rankings at all: most viewed first
+        TrendingAd.objects.all().delete()
+        cache.clear()
+        self.assertEqual(self.get_ids()[0], self.veteran.id)
+
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
+class ResponseCacheTest(APITestCase):
+    """Test the shared response cache for anonymous reads"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.flush)
+        self.addCleanup(view_log.flush)
+        self.seller = SellerUserFactory(address=None, full_name='Ali')
+        self.ad = AdFactory(
+            seller=self.seller, category=CategoryFactory(slug='cached-category'),
+            slug='cached-ad', name_uz='Telefon'
+        )
+        self.list_url = reverse('store:ads_list')
+        self.detail_url = reverse('store:ads_detail', kwargs={'slug': self.ad.slug})
+    
+    def test_hits_skip_database_until_invalidated(self):
+        """Test repeat reads are served from cache and saves drop them"""
+        self.client.get(self.list_url, {'b': '1', 'a': '2'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, {'a': '2', 'b': '1'})
+        self.assertEqual(response.data['results'][0]['name'], 'Telefon')
+        
+        self.ad.name_uz = 'Smartfon'
+        self.ad.save()
+        response = self.client.get(self.list_url, {'a': '2', 'b': '1'})
+        self.assertEqual(response.data['results'][0]['name'], 'Smartfon')
+        
+        self.client.get(self.detail_url)
+        self.seller.full_name = 'Vali'
+        self.seller.save()
+        self.assertEqual(self.client.get(self.detail_url).data['seller']['full_name'], 'Vali')
+    
+    def test_cached_detail_still_counts_views(self):
+        """Test cache hits on the detail page record the view"""
+        self.client.get(self.detail_url, REMOTE_ADDR='10.0.0.1')
+        with self.assertNumQueries(0):
+            self.client.get(self.detail_url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(view_counter.pending(self.ad.id), 2)
+        self.assertEqual(view_log.pending(), 2)
+    
+    def test_authenticated_requests_bypass_cache(self):
+        """Test logged-in users never get a shared response"""
+        self.client.get(self.list_url)
+        self.client.force_authenticate(UserFactory(address=None))
+        AdLike.objects.create(user=UserFactory(address=None), ad=self.ad)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url)
+        self.assertTrue(queries)
+    
+    def test_stale_served_while_revalidating(self):
+        """Test a stale entry is served while another request rebuilds it"""
+        from unittest import mock
+        
+        self.client.get(self.list_url)
+        self.ad.name_uz = 'Smartfon'
+        self.ad.save()
+        
+        add = cache.add
+        
+        def lock_taken(key, *args, **kwargs):
+            # Another worker holds the rebuild lock
+            return False if key.endswith(':lock') else add(key, *args, **kwargs)
+        
+        with mock.patch.object(cache, 'add', lock_taken), self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.data['results'][0]['name'], 'Telefon')
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['name'], 'Smartfon')
+
+@override_settings(COUNTER_BACKGROUND_FLUSH=False)
+class AdListProjectionTest(APITestCase):
+    """Test the projection path renders exactly what AdListSerializer does"""
+    
+    def setUp(self):
+        from apps.common.models import Address
+        
+        seller = SellerUserFactory(address=None)
+        seller.address = Address.objects.create(
+            user=seller, name='Chilonzor', street='Bunyodkor', city='Tashkent',
+            postal_code='100000', lat=41.2856, long=69.2034
+        )
+        seller.save()
+        other = SellerUserFactory(address=None)
+        self.user = UserFactory(address=None)
+        category = CategoryFactory(slug='projection-phones', name_uz='Telefonlar', name_ru='')
+        
+        self.long_ad = AdFactory(
+            seller=seller, category=category, slug='projection-long',
+            name_ru='', description_uz='x' * 250, description_ru='y' * 201
+        )
+        self.plain_ad = AdFactory(seller=other, category=category, slug='projection-plain')
+        for order in range(4):
+            AdPhotoFactory(ad=self.long_ad, order=order)
+        AdLike.objects.create(user=self.user, ad=self.plain_ad)
+        self.url = reverse('store:ads_list')
+    
+    def render_both(self, language, **params):
+        from django.test import RequestFactory
+        from django.utils import translation
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.request import Request
+        from apps.store.serializers import AdListSerializer, project_ad_list, serialize_ad_rows
+        
+        request = Request(RequestFactory().get(self.url, params))
+        request.user = self.user
+        queryset = Ad.objects.filter(is_active=True).order_by('id')
+        with translation.override(language):
+            expected = AdListSerializer(queryset, many=True, context={'request': request}).data
+            actual = serialize_ad_rows(project_ad_list(queryset), request)
+        return JSONRenderer().render(expected), JSONRenderer().render(actual)
+    
+    def test_projection_is_byte_identical(self):
+        """Test fallbacks, truncation, photos, addresses and likes match"""
+        for language in ('uz', 'ru'):
+            expected, actual = self.render_both(language)
+            self.assertEqual(actual, expected, language)
+    
+    def test_list_views_use_projection(self):
+        """Test page number and keyset responses stay the same shape"""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {ad['id']: ad for ad in response.data['results']}
+        self.assertEqual(len(results[self.long_ad.id]['photos']), 3)
+        self.assertTrue(results[self.plain_ad.id]['is_liked'])
+        self.assertEqual(results[self.long_ad.id]['seller']['address']['name'], 'Chilonzor')
+        self.assertIsNone(results[self.plain_ad.id]['seller']['address'])
+        
+        first = self.client.get(self.url, {'cursor': '', 'page_size': 1})
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(second.data['next'])
+        pages = first.data['results'] + second.data['results']
+        self.assertEqual(pages, list(response.data['results']))
+
+class AdExportTest(APITestCase):
+    """Test streamed CSV and NDJSON exports of advertisements"""
+    
+    def setUp(self):
+        self.client.force_authenticate(AdminUserFactory(address=None))
+        seller = SellerUserFactory(address=None)
+        self.phones = CategoryFactory(slug='export-phones')
+        cars = CategoryFactory(slug='export-cars')
+        self.ads = [
+            AdFactory(seller=seller, category=self.phones, slug=f'export-phone-{i}', is_active=i != 2)
+            for i in range(5)
+        ]
+        AdFactory(seller=seller, category=cars, slug='export-car')
+        for order in range(2):
+            AdPhotoFactory(ad=self.ads[0], order=order)
+        self.url = reverse('store:ads_export')
+    
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+    
+    def test_csv_rows(self):
+        """Test every matching ad, active or not, is exported in id order"""
+        import csv
+        import io
+        
+        rows = list(csv.DictReader(io.StringIO(self.export(category=self.phones.id))))
+        self.assertEqual([int(row['id']) for row in rows], [ad.id for ad in self.ads])
+        self.assertEqual(rows[2]['is_active'], 'False')
+        self.assertEqual(len(rows[0]['photos'].split()), 2)
+        self.assertEqual(rows[1]['photos'], '')
+        self.assertEqual(rows[0]['category_slug'], 'export-phones')
+    
+    def test_ndjson_rows(self):
+        """Test one JSON object per line with photo URL lists"""
+        import json
+        
+        lines = self.export(file_format='ndjson', category=self.phones.id).splitlines()
+        first = json.loads(lines[0])
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(first['slug'], 'export-phone-0')
+        self.assertEqual(len(first['photos']), 2)
+    
+    def test_queries_bounded_per_chunk(self):
+        """Test photos are fetched once per chunk rather than once per ad"""
+        from apps.common.exports import render_rows
+        from apps.store.exports import AD_EXPORT_COLUMNS, iter_ad_rows
+        
+        for ad in self.ads:
+            AdPhotoFactory(ad=ad, order=5)
+        with CaptureQueriesContext(connection) as queries:
+            lines = list(render_rows(iter_ad_rows(Ad.objects.all(), chunk_size=2), AD_EXPORT_COLUMNS, 'csv'))
+        self.assertEqual(len(lines), 7)
+        photo_queries = [q for q in queries.captured_queries if 'store_adphoto' in q['sql']]
+        self.assertEqual(len(photo_queries), 3)
+    
+    def test_invalid_format_and_permissions(self):
+        """Test bad formats are rejected and non-admins are refused"""
+        response = self.client.get(self.url, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.client.force_authenticate(SellerUserFactory(address=None))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class AdBulkCreateTest(APITestCase):
+    """Test creating many advertisements in one request"""
+    
+    def setUp(self):
+        self.seller = SellerUserFactory(address=None)
+        self.client.force_authenticate(self.seller)
+        self.category = CategoryFactory(slug='bulk-phones')
+        AdFactory(seller=self.seller, category=self.category, slug='iphone-13')
+        AdFactory(seller=self.seller, category=self.category, slug='iphone-13-1')
+        self.url = reverse('store:ads_bulk_create')
+    
+    def item(self, name='iPhone 13', **fields):
+        return {
+            'name_uz': name, 'name_ru': name, 'description_uz': 'Yangi',
+            'description_ru': 'Новый', 'price': '100.00', 'category': self.category.id,
+            **fields
+        }
+    
+    def test_creates_all_with_unique_slugs(self):
+        """Test ads take the next free slugs, also among themselves"""
+        response = self.client.post(self.url, {'ads': [self.item(), self.item(), self.item('Galaxy')]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(
+            [result['slug'] for result in response.data['results']],
+            ['iphone-13-2', 'iphone-13-3', 'galaxy']
+        )
+        self.assertEqual(Ad.objects.filter(seller=self.seller).count(), 5)
+    
+    def test_queries_independent_of_batch_size(self):
+        """Test one batch costs the same queries for 2 or 40 ads"""
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'ads': [self.item() for _ in range(size)]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+        
+        self.assertEqual(count_queries(2), count_queries(40))
+    
+    def test_invalid_item_creates_nothing(self):
+        """Test errors are reported per item and no ad is created"""
+        response = self.client.post(
+            self.url, {'ads': [self.item(), self.item(category=999999), self.item(price='')]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['ads']
+        self.assertEqual(errors[0], {})
+        self.assertIn('category', errors[1])
+        self.assertIn('price', errors[2])
+        self.assertEqual(Ad.objects.filter(seller=self.seller).count(), 2)
+    
+    def test_non_object_body_rejected(self):
+        """Test a bare JSON list is a bad request, not a server error"""
+        response = self.client.post(self.url, [self.item()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data)
+    
+    def test_other_integrity_errors_not_retried(self):
+        """Test a failed insert is retried only when a slug was lost"""
+        from unittest import mock
+        from django.db import IntegrityError
+        
+        with mock.patch.object(Ad.objects, 'bulk_create', side_effect=IntegrityError) as bulk_create:
+            with self.assertRaises(IntegrityError):
+                self.client.post(self.url, {'ads': [self.item('Unique name')]}, format='json')
+        self.assertEqual(bulk_create.call_count, 1)
+    
+    def test_multipart_photos(self):
+        """Test photos_<index> files are attached to their ad in order"""
+        import io
+        import json
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        
+        def photo(name):
+            buffer = io.BytesIO()
+            Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+            return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+        
+        response = self.client.post(self.url, {
+            'ads': json.dumps([self.item('Bulk photo'), self.item('Bulk plain')]),
+            'photos_0': [photo('a.png'), photo('b.png')],
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first, second = (result['id'] for result in response.data['results'])
+        self.assertEqual(AdPhoto.objects.filter(ad_id=first).count(), 2)
+        self.assertFalse(AdPhoto.objects.filter(ad_id=second).exists())
+    
+    def test_regular_user_cannot_bulk_create(self):
+        """Test only sellers may bulk create"""
+        self.client.force_authenticate(UserFactory(address=None))
+        response = self.client.post(self.url, {'ads': [self.item()]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class SlugAllocationTest(TestCase):
+    """Test slugs are allocated with one query and survive races"""
+    
+    def setUp(self):
+        self.seller = SellerUserFactory(address=None)
+        self.category = CategoryFactory(slug='slug-phones')
+    
+    def create_ad(self, name='iPhone 13'):
+        return Ad.objects.create(
+            name_uz=name, name_ru=name, description_uz='d', description_ru='d',
+            price=1, category=self.category, seller=self.seller
+        )
+    
+    def test_next_suffix_after_highest(self):
+        """Test new ads take the suffix after the highest, ignoring non-numeric ones"""
+        for slug in ('iphone-13', 'iphone-13-4', 'iphone-13-pro', 'iphone-13-10'):
+            AdFactory(seller=self.seller, category=self.category, slug=slug)
+        self.assertEqual(self.create_ad().slug, 'iphone-13-11')
+        self.assertEqual(self.create_ad('Galaxy').slug, 'galaxy')
+    
+    def test_queries_independent_of_namesakes(self):
+        """Test allocation costs one query however many ads share a title"""
+        from apps.common.utils import generate_unique_slug
+        
+        for index in range(30):
+            AdFactory(seller=self.seller, category=self.category, slug=f'iphone-13-{index}' if index else 'iphone-13')
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_unique_slug(Ad, 'iPhone 13'), 'iphone-13-30')
+    
+    def test_batch_never_repeats(self):
+        """Test a batch does not hand out a slug twice"""
+        from apps.common.utils import allocate_unique_slugs
+        
+        AdFactory(seller=self.seller, category=self.category, slug='case')
+        self.assertEqual(
+            allocate_unique_slugs(Ad, ['Case', 'Case', 'Case 1', 'Case 3']),
+            ['case-1', 'case-2', 'case-1-1', 'case-3']
+        )
+    
+    def test_retry_on_conflict(self):
+        """Test a slug taken by a concurrent insert is allocated again"""
+        from unittest import mock
+        
+        AdFactory(seller=self.seller, category=self.category, slug='raced')
+        with mock.patch('apps.common.utils.generate_unique_slug', side_effect=['raced', 'raced-1']):
+            self.assertEqual(self.create_ad('Raced').slug, 'raced-1')